@@ -99,16 +99,11 @@ def clip_layers_by_cutline(gds_path : str, workdir : str,cutlines : np.array, sh
 
 def clip_flow(cutlines_in_um, oas_file, cell_name, layer_id, shape, verbose):
     workdir = subclip_workdir(oas_file)
-    args_cache = os.path.join(workdir, "info.bin")
-    key_params = (cutlines_in_um.tolist(), oas_file, cell_name, layer_id, shape)
-    if os.path.exists(args_cache) and args_from_file(filepath=args_cache) == key_params: 
-        print("    subclip alread done")
-    else:
-        clip_layers_by_cutline(
-            oas_file, workdir, cutlines_in_um, shape, layer_id, cell_name
-        )
-        args_to_file(key_params, filepath=args_cache)
-        print("    subclip success")
+    # clip_layers 按窗口缓存, 只重新裁剪新增或改变的 gauge
+    clip_layers_by_cutline(
+        oas_file, workdir, cutlines_in_um, shape, layer_id, cell_name
+    )
+    print("    subclip success")
 
     if verbose in range(len(cutlines_in_um)):
         def get_midpoints_from_cutline(cutlines : np.array)-> np.array:
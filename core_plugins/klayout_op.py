@@ -2,38 +2,100 @@
 import os
 import argparse
 import tempfile
+import threading
 import numpy as np
+from collections import OrderedDict
 from params_io import *
 import klayout.db as pya
 from typing import List, Tuple
 import matplotlib.pyplot as plt
 
-def get_dbu(oas_file:str="",layout = None):
-    if layout is None:
-        assert(os.path.exists(oas_file))
+# 进程内共享的版图缓存, key 为 (realpath, mtime, size), 文件被改写后自动失效.
+# 缓存的 Layout 被多个调用方共享, 调用方不能修改它
+layout_cache = OrderedDict()
+layout_cache_budget = 4 << 30
+layout_cache_lock = threading.Lock()
+# 每个路径一把读取锁, 多个线程同时未命中同一个文件时只读一次
+layout_load_locks = dict()
+# Layout 没有暴露内存统计, 按文件大小估计; OASIS 压缩率高, 读入后通常是文件的 10 倍以上
+layout_file_expansion = 16
+
+def layout_nbytes(file_size):
+    return file_size * layout_file_expansion
+
+def evict_layout_cache(budget):
+    # 最近读入的版图总是保留 (预算为 0 时除外), 超出预算的整版图也能在连续的调用之间复用
+    keep = 1 if budget > 0 else 0
+    while len(layout_cache) > keep and sum(nbytes for _, nbytes in layout_cache.values()) > budget:
+        layout_cache.popitem(last=False)
+
+def set_layout_cache_budget(nbytes:int):
+    """设置版图缓存的内存预算 (估计值, 字节), 0 表示关闭缓存; 超出预算时仍保留最近读入的一个版图"""
+    global layout_cache_budget
+    with layout_cache_lock:
+        layout_cache_budget = nbytes
+        evict_layout_cache(nbytes)
+
+def clear_layout_cache():
+    with layout_cache_lock:
+        layout_cache.clear()
+
+def cached_layout(key):
+    # 调用方持有 layout_cache_lock
+    if key in layout_cache:
+        layout_cache.move_to_end(key)
+        return layout_cache[key][0]
+    # 同一路径的旧版本不会再被命中
+    for stale in [k for k in layout_cache if k[0] == key[0]]:
+        del layout_cache[stale]
+    return None
+
+def load_layout(oas_file:str):
+    assert(os.path.exists(oas_file))
+    st = os.stat(oas_file)
+    path = os.path.realpath(oas_file)
+    key = (path, st.st_mtime_ns, st.st_size)
+    with layout_cache_lock:
+        layout = cached_layout(key)
+        if layout is not None:
+            return layout
+        load_lock = layout_load_locks.setdefault(path, threading.Lock())
+    with load_lock:
+        # 等锁期间别的线程可能已经读完并放进缓存
+        with layout_cache_lock:
+            layout = cached_layout(key)
+        if layout is not None:
+            return layout
         layout = pya.Layout()
         layout.read(oas_file)
+        nbytes = layout_nbytes(st.st_size)
+        with layout_cache_lock:
+            if layout_cache_budget > 0:
+                layout_cache[key] = (layout, nbytes)
+                evict_layout_cache(layout_cache_budget)
+    return layout
+
+def get_dbu(oas_file:str="",layout = None):
+    if layout is None:
+        layout = load_layout(oas_file)
     return layout.dbu
 
 def load_shpaes(oas_file, cell_name, layer_id):
-    layout = pya.Layout()
-    layout.read(oas_file)
+    layout = load_layout(oas_file)
     # 获取目标单元格
     top_cell = layout.cell(cell_name) if cell_name else layout.top_cell()
     if not top_cell:
         raise ValueError("未找到指定单元格")
+    shapes = top_cell.shapes(find_layer_index(layout, layer_id))
+    return layout, top_cell, shapes
+
+def find_layer_index(layout, layer_id):
     # 查找目标图层
-    layer_index = None
     for li in layout.layer_indices():
         info = layout.get_info(li)
         if layer_id is None or (info.layer == layer_id and info.datatype == 0):
-            layer_index = li
-            break
-    if layer_index is None:
-        raise ValueError(f"未找到图层 {layer_id}/0")
-
-    shapes = top_cell.shapes(layer_index)
-    return layout, top_cell, shapes
+            return li
+    raise ValueError(f"未找到图层 {layer_id}/0")
 
 def save_region_to_file(clipped_region, dbu, cell_name, layer_id, path):
     # 保存结果
@@ -56,6 +118,369 @@ def save_region_to_file(clipped_region, dbu, cell_name, layer_id, path):
     else:
         print(f"跳过文件保存, 空裁剪区域: {path}")
 
+def clip_boxes(start_points, shape, dbu):
+    width, height = shape
+    clip_width_dbu = int(width / dbu)
+    clip_height_dbu = int(height / dbu)
+    boxes = list()
+    for sx, sy in start_points:
+        x_dbu = int(sx / dbu)
+        y_dbu = int(sy / dbu)
+        boxes.append(pya.Box(x_dbu, y_dbu, x_dbu + clip_width_dbu, y_dbu + clip_height_dbu))
+    return boxes
+
+def clip_window(indexed_shapes, clip_box, merge_tolerance=0.0):
+    """
+    indexed_shapes: pya.Shapes 只看这一层的图形 (已经合并过);
+        pya.RecursiveShapeIterator 沿层次结构向下, 只展平窗口内的图形, merge_tolerance 在窗口内合并
+    """
+    if isinstance(indexed_shapes, pya.RecursiveShapeIterator):
+        # 每个 cell 的 box tree 会剪掉窗口外的实例, 内存只与窗口面积相关
+        shape_iter = indexed_shapes.dup()
+        shape_iter.region = clip_box
+        shape_iter.overlapping = False
+        local_region = pya.Region(shape_iter)
+        # 覆盖次数是局部量, 在窗口内合并与整层合并的结果相同
+        if merge_tolerance > 0:
+            local_region.merge(merge_tolerance)
+        return local_region & pya.Region(clip_box)
+    # Shapes 自带 box tree, each_touching 只取与窗口相交的图形, 不再和整层做布尔运算
+    local_region = pya.Region()
+    for shape in indexed_shapes.each_touching(pya.Shapes.SRegions, clip_box):
+        local_region.insert(shape.polygon)
+    return local_region & pya.Region(clip_box)
+
+def append_hull(coords, poly):
+    # 只取外轮廓, 坐标按 x, y 交替追加到一个平坦 list, 比逐个多边形建数组少很多对象
+    n = len(coords)
+    for p in poly.each_point_hull():
+        coords.append(p.x)
+        coords.append(p.y)
+    return (len(coords) - n) // 2
+
+def coords_to_csr(coords, counts, dtype=np.int64):
+    offsets = np.zeros(len(counts) + 1, np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return np.array(coords, dtype).reshape(-1, 2), offsets
+
+def polygons_to_csr(polygons, dtype=np.int64):
+    """
+    把多边形打包成 CSR: vertices (total_vertices, 2), offsets (n + 1,) int64,
+    第 i 个多边形是 vertices[offsets[i]:offsets[i + 1]]. 带洞的多边形用 resolved_holes 转成单一外轮廓.
+    """
+    coords = list()
+    counts = list()
+    for poly in polygons:
+        if poly.holes() > 0:
+            poly = poly.resolved_holes()
+        counts.append(append_hull(coords, poly))
+    return coords_to_csr(coords, counts, dtype)
+
+def shapes_to_csr(shapes, dtype=np.int64):
+    """
+    与 polygons_to_csr 相同的 CSR, 按 shapes.each() 的顺序取 polygon 和 box 的外轮廓 (忽略洞, path 和 text),
+    box 的顶点顺序为 (left, bottom), (left, top), (right, top), (right, bottom)
+    """
+    coords = list()
+    counts = list()
+    for shape in shapes.each():
+        if shape.is_polygon():
+            counts.append(append_hull(coords, shape.polygon))
+        elif shape.is_box():
+            box = shape.box
+            left, bottom, right, top = box.left, box.bottom, box.right, box.top
+            coords.extend((left, bottom, left, top, right, top, right, bottom))
+            counts.append(4)
+    return coords_to_csr(coords, counts, dtype)
+
+clip_pack_magic = int.from_bytes(b'PYVCLIP1', 'little')
+clip_pack_fields = 8
+
+class clip_pack_writer:
+    """
+    所有裁剪结果写进一个文件 path, 索引写在 path + '.idx'.
+    索引第 0 条是文件头 [magic, fields, count, dbu(float64 的位), layer_id, 0, 0, 0],
+    之后每个 clip 一条 [offset, polygons, vertices, left, bottom, right, top, 0] (int64, dbu 坐标).
+    数据区每个 clip 依次是 offsets (polygons + 1) 和 vertices (vertices, 2), 均为 int64.
+    """
+    def __init__(self, path, dbu, layer_id):
+        self.path = path
+        self.dbu = dbu
+        self.layer_id = layer_id
+        # 旧的索引不能和新写了一半的数据配对, 先删除; 数据先写到临时文件, close 时再替换
+        for stale in (path + '.idx', path):
+            if os.path.exists(stale): os.remove(stale)
+        self.data_file = open(path + '.tmp', 'wb')
+        self.records = list()
+        self.offset = 0
+    def append(self, window, vertices, offsets):
+        """window: (left, bottom, right, top), dbu 坐标"""
+        self.records.append([self.offset, len(offsets) - 1, len(vertices)] + list(window) + [0])
+        for a in (offsets, vertices):
+            blob = np.ascontiguousarray(a, np.int64).tobytes()
+            self.data_file.write(blob)
+            self.offset = self.offset + len(blob)
+    def close(self):
+        """全部 clip 写完后调用, 数据和索引通过 rename 生效, 索引最后出现"""
+        self.data_file.close()
+        header = [clip_pack_magic, clip_pack_fields, len(self.records), int(np.float64(self.dbu or 0.0).view(np.int64)), self.layer_id, 0, 0, 0]
+        np.array([header] + self.records, np.int64).reshape(-1, clip_pack_fields).tofile(self.path + '.idx.tmp')
+        os.replace(self.path + '.tmp', self.path)
+        os.replace(self.path + '.idx.tmp', self.path + '.idx')
+        print(f"    已保存 {len(self.records)} 个裁剪区域: {self.path}")
+    def abort(self):
+        """裁剪失败时删除写了一半的文件, 不留下看起来完整的索引"""
+        self.data_file.close()
+        for partial in (self.path + '.tmp', self.path + '.idx.tmp', self.path, self.path + '.idx'):
+            if os.path.exists(partial): os.remove(partial)
+
+class clip_pack_reader:
+    def __init__(self, path):
+        index = np.fromfile(path + '.idx', np.int64).reshape(-1, clip_pack_fields)
+        if 0 == len(index) or clip_pack_magic != index[0, 0]:
+            raise ValueError(f"不是裁剪结果文件: {path}")
+        self.dbu = float(index[0, 3:4].view(np.float64)[0])
+        self.layer_id = int(index[0, 4])
+        self.index = index[1:]
+        self.data = np.memmap(path, np.int64, 'r') if os.path.getsize(path) else np.zeros(0, np.int64)
+    def __len__(self):
+        return self.index.shape[0]
+    def __getitem__(self, i):
+        """返回第 i 个 clip 的 (vertices, offsets), 都是文件的只读视图"""
+        offset, polygons, vertices = [int(v) for v in self.index[i, :3]]
+        begin = offset // 8
+        offsets = self.data[begin : begin + polygons + 1]
+        return self.data[begin + polygons + 1 : begin + polygons + 1 + 2 * vertices].reshape(-1, 2), offsets
+    def window(self, i):
+        """第 i 个 clip 的 (left, bottom, right, top), dbu 坐标"""
+        return tuple(int(v) for v in self.index[i, 3:7])
+    def polygons(self, i):
+        vertices, offsets = self[i]
+        return [vertices[offsets[k]:offsets[k + 1]] for k in range(len(offsets) - 1)]
+    def region(self, i):
+        region = pya.Region()
+        for poly in self.polygons(i):
+            region.insert(pya.Polygon([pya.Point(int(x), int(y)) for x, y in poly]))
+        return region
+
+# 每个裁剪窗口的结果按内容寻址缓存在 clip_cache_dir, key 由版图 (路径, mtime, size)、cell、图层、窗口和裁剪参数决定,
+# 重新运行时只裁剪缺失或改变的窗口. 条目的 mtime 在命中时更新, 超出 clip_cache_budget 时删除最久没用的条目.
+# 总大小记在 clip_cache_dir/usage, 每次运行只加上新写入的字节数, 超出预算或超过 clip_cache_rescan 秒才遍历整个目录
+clip_cache_dir = os.path.join(tempfile.gettempdir(), "simulation", ".clips")
+clip_cache_budget = 8 << 30
+clip_cache_rescan = 3600
+clip_cache_version = 2
+clip_csr_header = 7
+
+def layout_fingerprint(oas_file:str):
+    st = os.stat(oas_file)
+    return (os.path.realpath(oas_file), st.st_mtime_ns, st.st_size)
+
+def clip_cache_keys(oas_file, cell_name, layer_id, start_points, shape, merge_tolerance, hierarchical, output):
+    # 只用输入参数计算 key, 全部命中时不需要读版图
+    import hashlib
+    base = repr((clip_cache_version, layout_fingerprint(oas_file), cell_name, layer_id, tuple(shape), merge_tolerance, hierarchical, output))
+    return [hashlib.sha1(f"{base}{float(sx)!r},{float(sy)!r}".encode()).hexdigest() for sx, sy in start_points]
+
+def clip_cache_path(key, suffix):
+    return os.path.join(clip_cache_dir, key[:2], key + suffix)
+
+def clip_cache_entry(key, suffixes):
+    for suffix in suffixes:
+        entry = clip_cache_path(key, suffix)
+        if os.path.exists(entry):
+            return entry
+    return None
+
+def link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        import shutil
+        shutil.copyfile(src, dst)
+
+def clip_cache_put(key, suffix, write):
+    """返回写入的字节数"""
+    # 先写临时文件再 rename, 多个进程写同一个 key 也不会留下半个文件
+    entry = clip_cache_path(key, suffix)
+    os.makedirs(os.path.dirname(entry), exist_ok=True)
+    temp = f"{entry}.{os.getpid()}.tmp"
+    write(temp)
+    size = os.path.getsize(temp)
+    os.replace(temp, entry)
+    return size
+
+def clip_cache_get_file(key, path):
+    """命中时把缓存的 .oas 链接到 path (空窗口不生成文件), 返回是否命中"""
+    entry = clip_cache_entry(key, ('.oas', '.empty'))
+    if entry is None:
+        return False
+    os.utime(entry)
+    if entry.endswith('.oas'):
+        link_or_copy(entry, path)
+    return True
+
+def clip_cache_put_file(key, path, is_empty):
+    if is_empty:
+        return clip_cache_put(key, '.empty', lambda temp: open(temp, 'wb').close())
+    return clip_cache_put(key, '.oas', lambda temp: link_or_copy(path, temp))
+
+def clip_cache_get_csr(key):
+    """返回 (window, dbu, vertices, offsets), 未命中返回 None"""
+    entry = clip_cache_entry(key, ('.csr',))
+    if entry is None:
+        return None
+    os.utime(entry)
+    data = np.fromfile(entry, np.int64)
+    polygons = int(data[0])
+    offsets = data[clip_csr_header : clip_csr_header + polygons + 1]
+    vertices = data[clip_csr_header + polygons + 1:].reshape(-1, 2)
+    return tuple(int(v) for v in data[3:7]), float(data[2:3].view(np.float64)[0]), vertices, offsets
+
+def clip_cache_put_csr(key, window, dbu, vertices, offsets):
+    # [polygons, vertices, dbu(float64 的位), left, bottom, right, top] + offsets + vertices
+    header = np.array([len(offsets) - 1, len(vertices), np.float64(dbu).view(np.int64)] + list(window), np.int64)
+    data = np.concatenate([header, np.asarray(offsets, np.int64), np.asarray(vertices, np.int64).ravel()])
+    return clip_cache_put(key, '.csr', data.tofile)
+
+def clip_cache_usage_path():
+    return os.path.join(clip_cache_dir, "usage")
+
+def read_clip_cache_usage():
+    """返回 (总字节数, 上次遍历的时间), 没有记录时返回 None"""
+    try:
+        with open(clip_cache_usage_path()) as f:
+            total, scanned = f.read().split()
+        return int(total), float(scanned)
+    except (OSError, ValueError):
+        return None
+
+def write_clip_cache_usage(total, scanned):
+    path = clip_cache_usage_path()
+    os.makedirs(clip_cache_dir, exist_ok=True)
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, 'w') as f:
+        f.write(f"{total} {scanned}")
+    os.replace(temp, path)
+
+def evict_clip_cache(budget:int = None, written:int = None):
+    """
+    按 mtime 从旧到新删除缓存条目, 直到总大小不超过 budget (默认 clip_cache_budget)
+    written: 本次运行新写入的字节数; 给出时先用记录的总大小估算, 不超预算就不遍历目录
+    """
+    import time
+    budget = clip_cache_budget if budget is None else budget
+    usage = None if written is None else read_clip_cache_usage()
+    if usage is not None and time.time() - usage[1] < clip_cache_rescan:
+        # 估算只会偏大 (覆盖同一个 key, 其他进程删除的条目), 偏大时下面的遍历会重新校准
+        total = usage[0] + written
+        if total <= budget:
+            write_clip_cache_usage(total, usage[1])
+            return
+    entries = list()
+    scanned = time.time()
+    for root, dirs, files in os.walk(clip_cache_dir):
+        for name in files:
+            if root == clip_cache_dir: continue
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= budget:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    write_clip_cache_usage(total, scanned)
+    if removed:
+        print(f"    清理裁剪缓存 {removed} 个条目")
+
+def clip_cache_complete(keys, output):
+    suffixes = ('.csr',) if 'pack' == output else ('.oas', '.empty')
+    return all(clip_cache_entry(key, suffixes) is not None for key in keys)
+
+class clip_window_source:
+    """clip_window 需要的版图索引和窗口, 第一次用到时才读版图 (缓存全部命中时不读)"""
+    def __init__(self, oas_file, cell_name, layer_id, start_points, shape, merge_tolerance=0.0, hierarchical=False):
+        self.args = (oas_file, cell_name, layer_id, merge_tolerance, hierarchical)
+        self.start_points = start_points
+        self.shape = shape
+        self.indexed_shapes = None
+    def load(self):
+        if self.indexed_shapes is None:
+            self.indexed_shapes, self.dbu, self.top_cell_name = clip_source(*self.args)
+            self.boxes = clip_boxes(self.start_points, self.shape, self.dbu)
+        return self
+
+# fork 出来的 worker 直接继承, 不需要重新读版图和建索引
+clip_state = None
+
+def set_clip_state(state):
+    global clip_state
+    clip_state = state
+
+def clip_chunk(chunk, state=None):
+    """返回 (窗口数, pack 模式下的裁剪结果, 新写入缓存的字节数)"""
+    source, merge_tolerance, keys, layer_id, clip_dir, output = clip_state if state is None else state
+    packed = list()
+    written = 0
+    for n in chunk:
+        key = None if keys is None else keys[n]
+        if 'pack' == output:
+            item = None if key is None else clip_cache_get_csr(key)
+            if item is None:
+                # 条目可能在检查之后被别的进程清理掉, 这时才读版图
+                src = source.load()
+                box = src.boxes[n]
+                window = (box.left, box.bottom, box.right, box.top)
+                # 布尔运算的结果不保证合并, 重叠的图形会让光栅化的覆盖率重复计算
+                item = (window, src.dbu) + polygons_to_csr(clip_window(src.indexed_shapes, box, merge_tolerance).merged().each())
+                if key is not None: written += clip_cache_put_csr(key, *item)
+            packed.append((n,) + item)
+            continue
+        path = os.path.join(clip_dir, f"{n}.oas")
+        # 旧文件可能是缓存条目的硬链接, 必须先删除, 不能原地覆盖
+        if os.path.lexists(path): os.remove(path)
+        if key is not None and clip_cache_get_file(key, path):
+            continue
+        src = source.load()
+        clipped_region = clip_window(src.indexed_shapes, src.boxes[n], merge_tolerance)
+        save_region_to_file(clipped_region, src.dbu, src.top_cell_name, layer_id, path)
+        if key is not None: written += clip_cache_put_file(key, path, clipped_region.is_empty())
+    return len(chunk), packed, written
+
+def clip_source(oas_file, cell_name, layer_id, merge_tolerance=0.0, hierarchical=False):
+    """返回 clip_window 使用的 (indexed_shapes, dbu, top_cell_name)"""
+    layout, top_cell, shapes = load_shpaes(oas_file, cell_name, layer_id)
+    indexed_shapes = shapes
+    if hierarchical:
+        indexed_shapes = pya.RecursiveShapeIterator(layout, top_cell, find_layer_index(layout, layer_id))
+        indexed_shapes.shape_flags = pya.Shapes.SRegions
+    elif merge_tolerance > 0:
+        # 合并需要看到整层, 合并后放进独立的 Shapes 以便建立空间索引
+        layer_region = pya.Region()
+        layer_region.insert(shapes)
+        layer_region.merge(merge_tolerance)  # 合并相邻多边形
+        indexed_shapes = pya.Shapes()
+        indexed_shapes.insert(layer_region)
+    return indexed_shapes, layout.dbu, top_cell.name
+
+def clip_progress(done, total):
+    print(f"    已裁剪 {done}/{total}")
+
+def clip_context():
+    import multiprocessing as mp
+    methods = mp.get_all_start_methods()
+    return mp.get_context('fork' if 'fork' in methods else methods[0])
+
 # dbu 单位 : um/pixel
 def clip_layers(
     oas_file: str, 
@@ -64,78 +489,366 @@ def clip_layers(
     start_points: list[tuple[float, float]], 
     shape: tuple[float, float], 
     cell_name: str = None,
-    merge_tolerance: float = 0.0
+    merge_tolerance: float = 0.0,
+    workers: int = None,
+    progress = clip_progress,
+    output: str = 'files',
+    hierarchical: bool = False,
+    cache: bool = True
 ):
+    """
+    cache: 按窗口缓存裁剪结果 (见 clip_cache_dir), 只重新裁剪缺失或改变的窗口
+    hierarchical: False 只裁剪 cell 自身的图形 (不含实例); True 包含实例中的图形, 逐窗口展平, 不展平整层
+    workers: 进程数, 默认 CPU 数, 1 表示在当前进程中串行裁剪; 各进程输出的文件与串行一致
+    progress: 回调 progress(done, total), None 表示不报告进度
+    output: 'files' 每个窗口写一个 {n}.oas (空窗口跳过); 'pack' 全部写进 clip_dir/clips.bin, 用 clip_pack_reader 随机访问
+    返回 'files' 模式下返回 clip_dir, 'pack' 模式下返回 clips.bin 的路径
+    """
+    if output not in ('files', 'pack'):
+        raise ValueError(f"未知的输出模式 {output}")
+    global clip_state
     os.makedirs(clip_dir, exist_ok=True)
-    layout, top_cell, shapes = load_shpaes(oas_file, cell_name, layer_id)
-    dbu = layout.dbu
-    # 将 box 类型转化成 poly
-    layer_region = pya.Region()
-    layer_region.insert(shapes)
-    
-    if merge_tolerance > 0:
-        layer_region.merge(merge_tolerance)  # 合并相邻多边形
+    total = len(start_points)
+    keys = clip_cache_keys(oas_file, cell_name, layer_id, start_points, shape, merge_tolerance, hierarchical, output) if cache else None
+    source = clip_window_source(oas_file, cell_name, layer_id, start_points, shape, merge_tolerance, hierarchical)
+    if keys and clip_cache_complete(keys, output):
+        print(f"    {total} 个裁剪区域全部命中缓存")
+    else:
+        # 在 fork 之前读版图, worker 直接继承
+        source.load()
     
-    # 准备裁剪区域参数
-    width, height = shape
-    clip_width_dbu = int(width / dbu)
-    clip_height_dbu = int(height / dbu)
+    workers = min(workers or os.cpu_count() or 1, max(1, total))
+    chunksize = max(1, min(256, total // (16 * workers)))
+    chunks = [range(i, min(total, i + chunksize)) for i in range(0, total, chunksize)]
     
-    # 并行处理每个裁剪区域
-    print(f"开始处理 {len(start_points)} 个裁剪区域...")
-    for n, (sx, sy) in enumerate(start_points):
-        # 计算DBU坐标
-        x_dbu = int(sx / dbu)
-        y_dbu = int(sy / dbu)
-        # 创建裁剪区域
-        clip_box = pya.Box(
-            pya.Point(x_dbu, y_dbu),
-            pya.Point(x_dbu + clip_width_dbu, y_dbu + clip_height_dbu)
-        )
-        clip_region = pya.Region(clip_box)
-        clipped_region = layer_region & clip_region
-        save_region_to_file(clipped_region, layout.dbu, top_cell.name, layer_id, os.path.join(clip_dir, f"{n}.oas"))
+    print(f"开始处理 {total} 个裁剪区域, {workers} 个进程...")
+    clip_state = (source, merge_tolerance if hierarchical else 0.0, keys, layer_id, clip_dir, output)
+    pack_path = os.path.join(clip_dir, "clips.bin")
+    # dbu 由每个 clip 的结果 (可能来自缓存) 给出
+    writer = clip_pack_writer(pack_path, None, layer_id) if 'pack' == output else None
+    pool = None
+    done = 0
+    written = 0
+    try:
+        if 1 == workers:
+            results = map(clip_chunk, chunks)
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=clip_context())
+            # map 按提交顺序返回, pack 文件的内容与串行一致
+            results = pool.map(clip_chunk, chunks)
+        for count, packed, chunk_written in results:
+            for n, window, clip_dbu, vertices, offsets in packed:
+                assert(n == len(writer.records))
+                writer.dbu = clip_dbu
+                writer.append(window, vertices, offsets)
+            done += count
+            written += chunk_written
+            if progress: progress(done, total)
+    except BaseException:
+        if writer is not None: writer.abort()
+        raise
+    finally:
+        clip_state = None
+        if pool is not None: pool.shutdown()
+    if writer is not None: writer.close()
+    if cache: evict_clip_cache(written=written)
     print("处理完成！")
+    return pack_path if 'pack' == output else clip_dir
+
+def iter_clips(
+    oas_file: str, 
+    layer_id: int, 
+    start_points: list[tuple[float, float]], 
+    shape: tuple[float, float], 
+    cell_name: str = None,
+    merge_tolerance: float = 0.0,
+    hierarchical: bool = False,
+    workers: int = 1,
+    prefetch: int = 4,
+    chunksize: int = 64
+):
+    """
+    按 start_points 的顺序逐个产生 (n, window, (vertices, offsets)), 不写任何文件.
+    window 为 (left, bottom, right, top), vertices/offsets 是 polygons_to_csr 的 CSR, 都是 dbu 坐标;
+    裁剪结果与 clip_layers 相同, 参数含义也相同.
+    workers > 1 时后台最多同时计算 prefetch 个 chunk (每个 chunksize 个窗口), 内存与窗口总数无关
+    """
+    source = clip_window_source(oas_file, cell_name, layer_id, start_points, shape, merge_tolerance, hierarchical).load()
+    state = (source, merge_tolerance if hierarchical else 0.0, None, layer_id, None, 'pack')
+    chunks = (range(i, min(len(start_points), i + chunksize)) for i in range(0, len(start_points), chunksize))
+    def unpack(packed):
+        for n, window, clip_dbu, vertices, offsets in packed:
+            yield n, window, (vertices, offsets)
+    if workers is not None and workers <= 1:
+        for chunk in chunks:
+            yield from unpack(clip_chunk(chunk, state)[1])
+        return
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+    # 状态作为 initargs 传给 fork 出来的 worker, 不需要 pickle, 也不占用全局的 clip_state
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=clip_context(), initializer=set_clip_state, initargs=(state,))
+    pending = deque()
+    try:
+        for chunk in chunks:
+            pending.append(pool.submit(clip_chunk, chunk))
+            if len(pending) >= max(1, prefetch):
+                yield from unpack(pending.popleft().result()[1])
+        while pending:
+            yield from unpack(pending.popleft().result()[1])
+    finally:
+        # 调用方提前结束迭代时取消还没开始的 chunk
+        pool.shutdown(cancel_futures=True)
+
+# 光栅化: 窗口 (left, bottom, right, top) 和 pixel 都是 dbu 单位, 输出第 0 行对应窗口底部 (y 增大方向),
+# 显示为图像时需要 np.flipud. 所有多边形按 nonzero 规则填充, resolved_holes 的切线不影响结果
+def csr_edges(vertices, offsets, window, pixel):
+    """返回所有边在像素坐标下的 (x0, y0, x1, y1), 每个多边形首尾相连"""
+    left, bottom = window[0], window[1]
+    x = (vertices[:, 0] - left) / pixel
+    y = (vertices[:, 1] - bottom) / pixel
+    following = np.arange(1, len(vertices) + 1)
+    following[offsets[1:] - 1] = offsets[:-1]
+    return x, y, x[following], y[following]
+
+def raster_shape(window, pixel):
+    return int(np.ceil((window[3] - window[1]) / pixel)), int(np.ceil((window[2] - window[0]) / pixel))
+
+def expand_ranges(starts, counts):
+    """每个 i 展开成 starts[i], starts[i] + 1, ... 共 counts[i] 个, 返回 (所属的 i, 值)"""
+    owner = np.repeat(np.arange(len(counts)), counts)
+    first = np.cumsum(counts) - counts
+    return owner, starts[owner] + np.arange(owner.size) - first[owner]
+
+def rasterize_binary(vertices, offsets, window, pixel):
+    # 逐行扫描线: 每条边只展开到它跨过的像素行, 在交点右侧的第一个像素中心累加方向, 按行前缀和得到 winding number
+    h, w = raster_shape(window, pixel)
+    x0, y0, x1, y1 = csr_edges(vertices, offsets, window, pixel)
+    keep = y0 != y1
+    x0, y0, x1, y1 = x0[keep], y0[keep], x1[keep], y1[keep]
+    winding = np.where(y1 > y0, 1.0, -1.0)
+    # 像素中心 yc = row + 0.5, 边覆盖 [min(y), max(y)) 的行
+    first = np.clip(np.ceil(np.minimum(y0, y1) - 0.5), 0, h).astype(np.int64)
+    last = np.clip(np.ceil(np.maximum(y0, y1) - 0.5), 0, h).astype(np.int64)
+    edge, row = expand_ranges(first, last - first)
+    yc = row + 0.5
+    xc = x0[edge] + (yc - y0[edge]) * (x1[edge] - x0[edge]) / (y1[edge] - y0[edge])
+    col = np.clip(np.ceil(xc - 0.5), 0, w).astype(np.int64)
+    acc = np.bincount(row * (w + 1) + col, winding[edge], h * (w + 1)).reshape(h, w + 1)
+    return np.cumsum(acc, axis=1)[:, :w] != 0
+
+def rasterize_coverage(vertices, offsets, window, pixel):
+    # 有符号面积累加 (与 font-rs 相同): 边先按像素行切段, 每段把覆盖面积的增量写到它跨过的像素, 按行前缀和后 |acc| 即覆盖率
+    h, w = raster_shape(window, pixel)
+    x0, y0, x1, y1 = csr_edges(vertices, offsets, window, pixel)
+    keep = y0 != y1
+    x0, y0, x1, y1 = x0[keep], y0[keep], x1[keep], y1[keep]
+    direction = np.where(y1 > y0, 1.0, -1.0)
+    ya, yb = np.minimum(y0, y1), np.maximum(y0, y1)
+    xa = np.where(y1 > y0, x0, x1)
+    dxdy = (x1 - x0) / (y1 - y0)
+    first = np.clip(np.floor(ya), 0, h).astype(np.int64)
+    last = np.clip(np.ceil(yb), 0, h).astype(np.int64)
+    edge, row = expand_ranges(first, last - first)
+    ylo = np.maximum(row, ya[edge])
+    dy = np.minimum(row + 1, yb[edge]) - ylo
+    xs = xa[edge] + (ylo - ya[edge]) * dxdy[edge]
+    xe = xs + dxdy[edge] * dy
+    d = dy * direction[edge]
+    xl, xr = np.minimum(xs, xe), np.maximum(xs, xe)
+    c0 = np.floor(xl).astype(np.int64)
+    c1 = np.ceil(xr).astype(np.int64)
+    rows, cols, values = list(), list(), list()
+    def add(mask, col, value):
+        rows.append(row[mask])
+        cols.append(col)
+        values.append(value)
+    # 段落在一个像素内
+    single = c1 <= c0 + 1
+    xm = 0.5 * (xs + xe)[single] - c0[single]
+    add(single, c0[single], d[single] * (1 - xm))
+    add(single, c0[single] + 1, d[single] * xm)
+    # 段跨过多个像素: 两端的像素是三角形面积, 中间每个像素增加 d / (xr - xl)
+    multi = ~single
+    r, dm, a, b = row[multi], d[multi], c0[multi], c1[multi]
+    slope = 1 / (xr[multi] - xl[multi])
+    f0 = xl[multi] - a
+    a0 = 0.5 * slope * (1 - f0) ** 2
+    am = 0.5 * slope * (xr[multi] - b + 1) ** 2
+    add(multi, a, dm * a0)
+    add(multi, b, dm * am)
+    two = b == a + 2
+    rows.append(r[two]); cols.append(a[two] + 1); values.append((dm * (1 - a0 - am))[two])
+    wide = ~two
+    a1 = slope * (1.5 - f0)
+    a2 = a1 + (b - a - 3) * slope
+    rows.append(r[wide]); cols.append(a[wide] + 1); values.append((dm * (a1 - a0))[wide])
+    rows.append(r[wide]); cols.append(b[wide] - 1); values.append((dm * (1 - a2 - am))[wide])
+    inner, col = expand_ranges(a[wide] + 2, b[wide] - a[wide] - 3)
+    rows.append(r[wide][inner]); cols.append(col); values.append((dm * slope)[wide][inner])
+    row, col, value = np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
+    # 窗口左侧的增量并入第 0 列, 右侧的不影响窗口内的前缀和
+    acc = np.bincount(row * (w + 1) + np.clip(col, 0, w), value, h * (w + 1)).reshape(h, w + 1)
+    return np.minimum(np.abs(np.cumsum(acc, axis=1)[:, :w]), 1)
+
+def rasterize_csr(vertices, offsets, window, pixel, coverage=False, dtype=np.float32):
+    """
+    把 CSR 多边形 (见 polygons_to_csr) 光栅化成 (H, W) mask.
+    参数:
+        window: (left, bottom, right, top), dbu 坐标; H, W 为窗口尺寸除以 pixel 向上取整
+        pixel: 像素尺寸, dbu 单位
+        coverage: False 按像素中心是否在多边形内得到 0/1; True 得到精确的面积覆盖率 (抗锯齿)
+    coverage 只对互不重叠的多边形精确, 重叠部分会重复计算; clip pack / iter_clips 的结果已经合并,
+    其它来源 (例如 load_oas_vertexs) 请先合并, 或者使用 rasterize_region
+    """
+    vertices = np.asarray(vertices, np.float64).reshape(-1, 2)
+    offsets = np.asarray(offsets, np.int64)
+    if 0 == len(vertices):
+        return np.zeros(raster_shape(window, pixel), dtype)
+    if coverage:
+        return rasterize_coverage(vertices, offsets, window, pixel).astype(dtype)
+    return rasterize_binary(vertices, offsets, window, pixel).astype(dtype)
+
+def rasterize_region(region, window, pixel, coverage=False, dtype=np.float32):
+    """参数同 rasterize_csr, region 为 pya.Region (例如 clip_window 的结果), 光栅化前先合并"""
+    vertices, offsets = polygons_to_csr(region.merged().each())
+    return rasterize_csr(vertices, offsets, window, pixel, coverage, dtype)
+
+def rasterize_clips(clips, pixel, coverage=False, dtype=np.float32):
+    """
+    批量光栅化, clips 为 (window, vertices, offsets) 的序列, 所有窗口尺寸必须相同, 返回 (N, H, W)
+    """
+    masks = None
+    for n, (window, vertices, offsets) in enumerate(clips):
+        if masks is None:
+            masks = np.zeros((len(clips),) + raster_shape(window, pixel), dtype)
+        if masks.shape[1:] != raster_shape(window, pixel):
+            raise ValueError(f"裁剪区域 {n} 的尺寸与第一个不同")
+        masks[n] = rasterize_csr(vertices, offsets, window, pixel, coverage, dtype)
+    return np.zeros((0, 0, 0), dtype) if masks is None else masks
+
+def rasterize_clip_pack(path:str, pixel:float, coverage:bool = False, dtype=np.float32):
+    """光栅化 clip_layers(..., output='pack') 的结果, pixel 为 um, 返回 (N, H, W)"""
+    reader = clip_pack_reader(path)
+    clips = [(reader.window(n),) + reader[n] for n in range(len(reader))]
+    return rasterize_clips(clips, pixel / reader.dbu, coverage, dtype)
+
+def test_rasterize():
+    # 两个重叠的 box, 覆盖率之和必须等于合并后的面积, 二值 mask 与像素中心测试一致
+    pixel = 700
+    window = (0, 0, 5000, 5000)
+    region = pya.Region()
+    region.insert(pya.Box(100, 100, 2550, 2550))
+    region.insert(pya.Box(1230, 1230, 3770, 3770))
+    h, w = raster_shape(window, pixel)
+    coverage = rasterize_region(region, window, pixel, True, np.float64)
+    clipped = region.merged() & pya.Region(pya.Box(0, 0, w * pixel, h * pixel))
+    assert(abs(coverage.sum() * pixel * pixel - clipped.area()) < 1e-6 * clipped.area())
+    for i in range(h):
+        for j in range(w):
+            cell = pya.Region(pya.Box(j * pixel, i * pixel, (j + 1) * pixel, (i + 1) * pixel))
+            assert(abs((clipped & cell).area() / (pixel * pixel) - coverage[i, j]) < 1e-9)
+    binary = rasterize_region(region, window, pixel)
+    for i in range(h):
+        for j in range(w):
+            center = pya.Point(j * pixel + pixel // 2, i * pixel + pixel // 2)
+            assert(bool(binary[i, j]) == any(p.inside(center) for p in clipped.each()))
+    print("rasterize test pass")
+
+# 宽和高都不到 outline_min_pixels 个像素的多边形不画轮廓, 只在中心画一个像素点
+outline_min_pixels = 1.0
+
+class layout_outline:
+    def __init__(self, ax, vertices, offsets, min_pixels=outline_min_pixels):
+        self.ax = ax
+        self.collection = None
+        self.dots = None
+        self.min_pixels = min_pixels
+        self.visible = None
+        self.polys = [vertices[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+        if 0 == len(self.polys):
+            self.xmin = self.xmax = self.ymin = self.ymax = np.zeros(0)
+            return
+        starts = offsets[:-1]
+        self.xmin = np.minimum.reduceat(vertices[:, 0], starts)
+        self.xmax = np.maximum.reduceat(vertices[:, 0], starts)
+        self.ymin = np.minimum.reduceat(vertices[:, 1], starts)
+        self.ymax = np.maximum.reduceat(vertices[:, 1], starts)
+    def bounds(self):
+        return self.xmin.min(), self.xmax.max(), self.ymin.min(), self.ymax.max()
+    def view_mask(self):
+        """返回 (outlines, dots) 两个 mask"""
+        x0, x1 = sorted(self.ax.get_xlim())
+        y0, y1 = sorted(self.ax.get_ylim())
+        # 只保留包围盒与视口相交的多边形
+        inside = (self.xmax >= x0) & (self.xmin <= x1) & (self.ymax >= y0) & (self.ymin <= y1)
+        if self.min_pixels <= 0:
+            return inside, np.zeros_like(inside)
+        bbox = self.ax.get_window_extent()
+        px = bbox.width / max(x1 - x0, np.finfo(float).tiny)
+        py = bbox.height / max(y1 - y0, np.finfo(float).tiny)
+        small = ((self.xmax - self.xmin) * px < self.min_pixels) & ((self.ymax - self.ymin) * py < self.min_pixels)
+        return inside & ~small, inside & small
+    def refresh(self, force=False):
+        outlines, dots = self.view_mask()
+        if not force and self.visible is not None and np.array_equal(outlines, self.visible[0]) and np.array_equal(dots, self.visible[1]):
+            return False
+        self.visible = (outlines, dots)
+        self.collection.set_verts([self.polys[i] for i in np.flatnonzero(outlines)])
+        self.dots.set_data((self.xmin[dots] + self.xmax[dots]) / 2, (self.ymin[dots] + self.ymax[dots]) / 2)
+        return True
+    def on_view_changed(self, *args):
+        if self.refresh():
+            self.ax.figure.canvas.draw_idle()
+    def connect(self, collection, dots):
+        # 回调只保存弱引用, 由 collection 持有 outline 对象
+        self.collection = collection
+        self.dots = dots
+        collection.outline = self
+        self.ax.callbacks.connect('xlim_changed', self.on_view_changed)
+        self.ax.callbacks.connect('ylim_changed', self.on_view_changed)
+        self.ax.figure.canvas.mpl_connect('resize_event', self.on_view_changed)
+
+def draw_outlines(ax, vertices, offsets, color='b', min_pixels=outline_min_pixels):
+    """
+    用一个 PolyCollection 绘制 CSR 格式 (见 load_oas_vertexs(packed=True)) 的多边形外轮廓,
+    缩放/平移时只绘制视口内的多边形, 小于 min_pixels 像素的多边形画成一个像素点, min_pixels=0 表示总是画轮廓
+    """
+    from matplotlib.collections import PolyCollection
+    outline = layout_outline(ax, vertices, offsets, min_pixels)
+    collection = PolyCollection([], closed=True, facecolors='none', edgecolors=color, linewidths=plt.rcParams['lines.linewidth'])
+    ax.add_collection(collection, autolim=False)
+    dots, = ax.plot([], [], ',', color=color)
+    if len(outline.polys):
+        x0, x1, y0, y1 = outline.bounds()
+        ax.update_datalim([[x0, y0], [x1, y1]])
+        ax.autoscale_view()
+    outline.connect(collection, dots)
+    outline.refresh(force=True)
+    return collection, outline
 
 def draw_oas_with_holes(oas_file, cell_name, layer_id):
-    layout, cell, shapes = load_shpaes(oas_file, cell_name, layer_id)
-    
-    def plot_points(outer:np.array, color :str = 'r-'):
-        outer = outer * layout.dbu
-        x = [p[0] for p in outer]
-        y = [p[1] for p in outer]
-        x.append(x[0])  # 闭合
-        y.append(y[0])  # 闭合
-        plt.plot(x, y, color)
-    from hole_algo import get_outer_and_holes_from_poinst
-    for shape in shapes.each():
-        if shape.is_polygon():
-            poly = shape.polygon
-            # 绘制外轮廓
-            hull_points = np.array([[p.x, p.y] for p in poly.each_point_hull()])
-            outer = hull_points
-            holes = []
-            # outer, holes = get_outer_and_holes_from_poinst(hull_points)
-            plot_points(outer, 'b-')
-            for hole in holes:
-                plot_points(hole, 'r--')
-        elif shape.is_box():
-            box = shape.box
-            plot_points(np.array([
-                [box.left, box.bottom], 
-                [box.left, box.top], 
-                [box.right, box.top], 
-                [box.right, box.bottom]
-            ]), 'b-')
+    # 洞目前没有单独绘制, 参考 load_oas_vertexs
+    vertices, offsets = load_oas_vertexs(oas_file, cell_name, layer_id, packed=True)
+    collection, outline = draw_outlines(plt.gca(), vertices * get_dbu(oas_file), offsets, 'b')
 
     plt.xlabel("X (um)")
     plt.ylabel("Y (um)")
     plt.title(f"Layer {layer_id} from {oas_file}")
     plt.grid(True)
     plt.axis('equal')  
+    return collection, outline
 
-def load_oas_vertexs(oas_file, cell_name, layer_id):
+def load_oas_vertexs(oas_file, cell_name, layer_id, packed=False, dtype=np.int64):
+    """
+    packed=False 返回 (poly_vertexs, hole_vertexs), 每个多边形一个 (n, 2) 数组;
+    packed=True 返回 CSR (vertices, offsets), vertices 为连续的 (total_vertices, 2) dtype 数组,
+        第 i 个多边形是 vertices[offsets[i]:offsets[i + 1]], c++ 可以直接引用, 不用逐个多边形转换
+    """
     layout, cell, shapes = load_shpaes(oas_file, cell_name, layer_id)
+    vertices, offsets = shapes_to_csr(shapes, dtype)
+    if packed:
+        return vertices, offsets
     
     def plot_points(outer:np.array, color :str = 'r-'):
         outer = outer * layout.dbu
@@ -144,39 +857,14 @@ def load_oas_vertexs(oas_file, cell_name, layer_id):
         x.append(x[0])  # 闭合
         y.append(y[0])  # 闭合
         plt.plot(x, y, color)
-    from hole_algo import get_outer_and_holes_from_poinst
-    poly_vertexs = list()
+    # outer, holes = get_outer_and_holes_from_poinst(hull_points) 目前没有启用, hole_vertexs 总是为空
+    poly_vertexs = [vertices[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
     hole_vertexs = list()
 
     debug = False
-    for shape in shapes.each():
-        if shape.is_polygon():
-            poly = shape.polygon
-            # 绘制外轮廓
-            hull_points = np.array([[p.x, p.y] for p in poly.each_point_hull()], dtype= np.int64)
-            outer = hull_points
-            holes = []
-
-            # outer, holes = get_outer_and_holes_from_poinst(hull_points)
-            # assert(outer.dtype == np.int64)
-            # if 0 != len(holes): assert(holes[0].dtype == np.int64)
-            poly_vertexs.append(outer)
-            hole_vertexs = hole_vertexs + holes
-            if debug:
-                plot_points(outer, 'b-')
-                for hole in holes:
-                    plot_points(hole, 'r--')
-        elif shape.is_box():
-            box = shape.box
-            outer = np.array([
-                [box.left, box.bottom], 
-                [box.left, box.top], 
-                [box.right, box.top], 
-                [box.right, box.bottom]
-            ], dtype= np.int64)
-            poly_vertexs.append(outer)
-            if debug: plot_points(outer, 'b-')
     if debug:
+        for outer in poly_vertexs:
+            plot_points(outer, 'b-')
         plt.xlabel("X (um)")
         plt.ylabel("Y (um)")
         plt.title(f"Layer {layer_id} from {oas_file}")
@@ -198,11 +886,13 @@ def parse_shape(s: str) -> Tuple[float, float]:
     return tuple(map(float, s.split(',')))
 
 def subclip_workdir(oas_file:str):
-    # create dir to save sub-clip
-    clip_dir = os.path.join(tempfile.gettempdir(), "simulation")
-    clip_dir = os.path.join(clip_dir, os.path.splitext(os.path.basename(oas_file))[0])
+    # create dir to save sub-clip, 目录名带上完整路径的 hash, 同名的不同版图不会共用目录
+    import hashlib
+    name = os.path.splitext(os.path.basename(oas_file))[0]
+    digest = hashlib.sha1(os.path.realpath(oas_file).encode()).hexdigest()[:8]
+    clip_dir = os.path.join(tempfile.gettempdir(), "simulation", f"{name}_{digest}")
     print(f"    subclip workdir is {clip_dir}")
-    assert(0 == os.system(f"mkdir -p {clip_dir}"))
+    os.makedirs(clip_dir, exist_ok=True)
     return clip_dir
 
 def main():
@@ -244,6 +934,24 @@ def main():
         help='裁剪矩形形状，格式为"width,height"',
         metavar='W,H'
     )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='并行裁剪的进程数, 默认 CPU 数'
+    )
+    parser.add_argument(
+        '--output',
+        type=str,
+        default='files',
+        choices=['files', 'pack'],
+        help='files: 每个裁剪区域一个 .oas; pack: 全部写进 clips.bin 并建立索引'
+    )
+    parser.add_argument(
+        '--hierarchical',
+        action='store_true',
+        help='包含子单元实例中的图形, 只展平每个裁剪窗口内的部分'
+    )
     
     # 解析参数
     args = parser.parse_args()
@@ -262,20 +970,18 @@ def main():
         parser.error(f"参数格式错误: {e}")
     
     workdir = subclip_workdir(args.oas_file)
-    key_params = (args.oas_file, args.layer_id, args.cell_name, shape, start_points)
-    args_cache = os.path.join(workdir, "info.bin")
-    if os.path.exists(args_cache) and args_from_file(filepath=args_cache) == key_params: 
-        print("    subclip alread done")
-        return
+    # 每个裁剪窗口单独缓存, 参考 clip_cache_keys
     clip_layers(
         oas_file=args.oas_file,
         clip_dir=workdir,
         layer_id=args.layer_id,
         start_points=start_points,
         shape=shape,
-        cell_name=args.cell_name
+        cell_name=args.cell_name,
+        workers=args.workers,
+        output=args.output,
+        hierarchical=args.hierarchical
     )
-    args_to_file(key_params, filepath=args_cache)
 
 '''
 python klayout_op.py /home/like/model_data/X_File/LG40_poly_File/LG40_PC_CDU_Contour_Mask_L300.oas "JDV_M" 300  \
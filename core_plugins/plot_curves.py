@@ -2,7 +2,54 @@
 import numpy as np
 import matplotlib.pyplot as plt
 
-def plot_curves(lines, start_x=None, step_x=None, legends=None, types=None, sample_rate=1.0):
+def minmax_decimate(x, y, n_buckets):
+    """
+    把曲线分成 n_buckets 个等长的桶, 每个桶只保留最小值和最大值两个点 (向量化)。
+    峰值不会丢失, 结果是确定的。
+    """
+    m = y.size
+    if n_buckets < 1 or m <= 2 * n_buckets:
+        return x, y
+    size = m // n_buckets
+    trimmed = size * n_buckets
+    blocks = y[:trimmed].reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    keep = [offsets + blocks.argmin(axis=1), offsets + blocks.argmax(axis=1), [0, m - 1]]
+    if trimmed < m:
+        tail = y[trimmed:]
+        keep.append([trimmed + tail.argmin(), trimmed + tail.argmax()])
+    idx = np.unique(np.concatenate(keep))
+    return x[idx], y[idx]
+
+def lttb_decimate(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets 降采样到 n_out 个点, 保留曲线形状, 结果是确定的。
+    """
+    m = y.size
+    if n_out < 3 or m <= n_out:
+        return x, y
+    x = np.asarray(x, np.float64)
+    yf = np.asarray(y, np.float64)
+    # n_out - 2 个中间桶, 首尾两点固定保留
+    edges = np.linspace(1, m - 1, n_out - 1).astype(np.int64)
+    idx = np.empty(n_out, np.int64)
+    idx[0], idx[-1] = 0, m - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else m)
+        cx, cy = x[nlo:nhi].mean(), yf[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (yf[lo:hi] - yf[a]) - (x[a] - x[lo:hi]) * (cy - yf[a]))
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return x[idx], y[idx]
+
+def decimate_curve(x, y, n_points, method='minmax'):
+    if 'lttb' == method:
+        return lttb_decimate(x, y, n_points)
+    return minmax_decimate(x, y, max(1, n_points // 2))
+
+def plot_curves(lines, start_x=None, step_x=None, legends=None, types=None, sample_rate=1.0, decimate='minmax'):
     """
     绘制曲线。
 
@@ -12,7 +59,10 @@ def plot_curves(lines, start_x=None, step_x=None, legends=None, types=None, samp
         step_x (list, optional): 长度为 n 的列表，表示每条曲线的 x 步长。默认为 None。
         legends (list, optional): 长度为 n 的列表，表示每条曲线的图例。默认为 None。
         types (list, optional): 长度为 n 的列表，表示每条曲线的绘制方式。默认为 None。
-        sample_rate (float, optional): 0-1 之间的浮点数，表示采样率。默认为 1.0 (不采样)。
+        sample_rate (float, optional): 0-1 之间的浮点数，小于 1.0 时每条曲线降采样到 m * sample_rate 个点 (至少 2 个)。
+            默认为 1.0, 按坐标轴的像素宽度自动降采样。
+        decimate (str, optional): 降采样方式, 'minmax' (每个桶保留最小/最大值) 或 'lttb'。
+            None 表示 sample_rate 为 1.0 时不自动降采样 (sample_rate 小于 1.0 时按 'minmax')。
     """
 
     n = len(lines)  # 曲线的数量
@@ -26,19 +76,20 @@ def plot_curves(lines, start_x=None, step_x=None, legends=None, types=None, samp
     if types is None:
         types = ['-'] * n
 
+    # 每个像素列最多保留两个点
+    pixel_width = int(plt.gca().get_window_extent().width)
     for i in range(n):
-        y = np.array(lines[i])  # 将list转化为numpy array
+        y = np.asarray(lines[i])  # 将list转化为numpy array
         m = len(y) # 获取当前曲线的点数
-        x = np.array([start_x[i] + j * step_x[i] for j in range(m)])
+        x = start_x[i] + step_x[i] * np.arange(m)
 
         if sample_rate < 1.0:
             sample_size = int(m * sample_rate)
             if sample_size < 2:
                 sample_size = 2  # 确保采样后的点数至少为 2
-            sample_indices = np.random.choice(m, size=sample_size, replace=False)
-            sample_indices.sort()
-            x = x[sample_indices]
-            y = y[sample_indices]
+            x, y = decimate_curve(x, y, sample_size, decimate or 'minmax')
+        elif decimate is not None:
+            x, y = decimate_curve(x, y, 2 * pixel_width, decimate)
 
         plt.plot(x, y, types[i], label=legends[i])
 
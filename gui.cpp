@@ -74,8 +74,8 @@ void test_imshow()
 {
     auto [im, shape] = load_image<std::complex<float>>(get_golden_dir() / "pupil_TE_y.bin");
     std::cout << "shape is " << shape << std::endl;
-    auto [real_part, imag_part] = decompose_from<std::complex<float>, float, float>(im);
-    imshow(real_part, std::vector<size_t>(shape.rbegin(), shape.rend()));
+    // 复数帧直接传给 python, 按 'm' 切换 实部/虚部/幅值/相位/对数功率
+    imshow(im, std::vector<size_t>(shape.rbegin(), shape.rend()));
 }
 
 int main() 
@@ -0,0 +1,65 @@
+#pragma once
+#include <array>
+#include <cstdint>
+#include <cstring>
+#include <fstream>
+#include <stdexcept>
+#include <string>
+#include <tuple>
+#include <vector>
+
+// klayout_op.clip_layers(..., output='pack') 输出的读取端, 布局与 klayout_op.py 的 clip_pack_writer 一致.
+// 只读索引和需要的那个 clip, 不经过 python, 也不需要 GIL.
+struct clip_pack_reader
+{
+    static constexpr int64_t magic = 0x3150494c43565950; // "PYVCLIP1"
+    static constexpr size_t fields = 8;
+
+    std::string path;
+    double dbu = 0;
+    int64_t layer_id = 0;
+    std::vector<int64_t> index;
+    std::ifstream data;
+
+    explicit clip_pack_reader(const std::string& pack_path) : path(pack_path), data(pack_path, std::ios::binary)
+    {
+        if (!data) throw std::runtime_error("clip_pack_reader : open failed " + path);
+        std::ifstream idx(path + ".idx", std::ios::binary | std::ios::ate);
+        if (!idx) throw std::runtime_error("clip_pack_reader : open failed " + path + ".idx");
+        const size_t nbytes = size_t(idx.tellg());
+        if (nbytes < fields * sizeof(int64_t) || 0 != nbytes % (fields * sizeof(int64_t)))
+            throw std::runtime_error("clip_pack_reader : broken index " + path);
+        index.resize(nbytes / sizeof(int64_t));
+        idx.seekg(0);
+        idx.read(reinterpret_cast<char*>(index.data()), nbytes);
+        if (magic != index.at(0)) throw std::runtime_error("clip_pack_reader : bad magic " + path);
+        std::memcpy(&dbu, &index.at(3), sizeof(double));
+        layer_id = index.at(4);
+    }
+    size_t size() const { return index.size() / fields - 1; }
+    const int64_t* record(size_t i) const
+    {
+        if (i >= size()) throw std::out_of_range("clip_pack_reader : clip index out of range");
+        return index.data() + (i + 1) * fields;
+    }
+    // {left, bottom, right, top}, dbu 坐标
+    std::array<int64_t, 4> window(size_t i) const
+    {
+        const int64_t* r = record(i);
+        return {r[3], r[4], r[5], r[6]};
+    }
+    // 返回 (vertices, offsets), vertices 是 {x0, y0, x1, y1, ...},
+    // 第 k 个多边形是 vertices[2 * offsets[k], 2 * offsets[k + 1])
+    std::tuple<std::vector<int64_t>, std::vector<int64_t>> read(size_t i)
+    {
+        const int64_t* r = record(i);
+        std::vector<int64_t> offsets(size_t(r[1]) + 1);
+        std::vector<int64_t> vertices(size_t(r[2]) * 2);
+        data.clear();
+        data.seekg(r[0]);
+        data.read(reinterpret_cast<char*>(offsets.data()), offsets.size() * sizeof(int64_t));
+        data.read(reinterpret_cast<char*>(vertices.data()), vertices.size() * sizeof(int64_t));
+        if (!data) throw std::runtime_error("clip_pack_reader : truncated data " + path);
+        return {std::move(vertices), std::move(offsets)};
+    }
+};
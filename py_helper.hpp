@@ -104,9 +104,12 @@ template <class TPixel> inline  std::pair<TPixel*, size_t> ndarray_ref_no_paddin
     }
     static auto create_callback_simulation_fram_done(
         py::object callback_click = py::object(),
-        py::object callback_motion = py::object()
+        py::object callback_motion = py::object(),
+        const std::string& render_mode = "sync"
     ) {
-        auto callback_fram_display = [plot = py_plot(), callback_click, callback_motion](np::ndarray data) mutable {
+        py_plot plot;
+        catch_py_error(plot.visulizer["set_render_mode"](render_mode));
+        auto callback_fram_display = [plot = std::move(plot), callback_click, callback_motion](np::ndarray data) mutable {
             if (get_cancel_token()) return false;
             catch_py_error(plot.visulizer["update"](data));
             if (!plot.event_init) {
@@ -145,6 +148,73 @@ template<class T> inline std::tuple<std::vector<T>, vec2<size_t>> load_image(con
     return std::tuple<std::vector<T>, vec2<size_t>>(std::vector<T>((T*)p, (T*)p + size), vec2<size_t>{y, x});
 }
 
+template<class T> inline std::tuple<std::vector<T>, vec2<size_t>> load_image_frame(const std::string& path, size_t index, const std::vector<size_t> shape = {}){
+    constexpr const char* str = get_numerical_type_str_suffix<T>();
+    static_assert("" != str);
+    std::string t = str;
+    py::object obj;
+    catch_py_error(obj = py_plot().visulizer["load_binary_image_frame"](path, index, convert_to<std::vector<std::string>>(shape), t));
+    np::ndarray array = convert_to<np::ndarray>(obj);
+    auto [p, size] = ndarray_ref_no_padding<vec<T, 1>>(array);
+    size_t y = array.shape(0);
+    size_t x = size / y;
+    return std::tuple<std::vector<T>, vec2<size_t>>(std::vector<T>((T*)p, (T*)p + size), vec2<size_t>{y, x});
+}
+
+// klayout_op.load_oas_vertexs(..., packed=True) 的 CSR 结果, 第 k 个多边形是 vertices[offsets[k], offsets[k + 1])
+template<class T = int64_t> inline std::tuple<std::vector<vec2<T>>, std::vector<int64_t>> load_oas_vertexs(
+    const std::string& oas_file, const std::string& cell_name, int layer_id
+){
+    py::object obj = py_plugin::call<py::object>("klayout_op", "load_oas_vertexs", oas_file, cell_name, layer_id, true, np::dtype::get_builtin<T>());
+    np::ndarray vertices = convert_to<np::ndarray>(obj[0]);
+    np::ndarray offsets = convert_to<np::ndarray>(obj[1]);
+    auto [pv, nv] = ndarray_ref_no_padding<vec2<T>>(vertices);
+    auto [po, no] = ndarray_ref_no_padding<vec<int64_t, 1>>(offsets);
+    return std::tuple<std::vector<vec2<T>>, std::vector<int64_t>>(
+        std::vector<vec2<T>>(pv, pv + nv), std::vector<int64_t>((int64_t*)po, (int64_t*)po + no)
+    );
+}
+
+// klayout_op.rasterize_clip_pack 的结果, shape 为 {N, H, W}, 每个 mask 的第 0 行对应裁剪窗口底部
+template<class T = float> inline std::tuple<std::vector<T>, std::array<size_t, 3>> rasterize_clip_pack(
+    const std::string& pack_path, double pixel_um, bool coverage = false
+){
+    py::object obj = py_plugin::call<py::object>("klayout_op", "rasterize_clip_pack", pack_path, pixel_um, coverage, np::dtype::get_builtin<T>());
+    np::ndarray masks = convert_to<np::ndarray>(obj);
+    auto [p, size] = ndarray_ref_no_padding<vec<T, 1>>(masks);
+    return std::tuple<std::vector<T>, std::array<size_t, 3>>(
+        std::vector<T>((T*)p, (T*)p + size), std::array<size_t, 3>{size_t(masks.shape(0)), size_t(masks.shape(1)), size_t(masks.shape(2))}
+    );
+}
+
+// klayout_op.iter_clips 的 c++ 入口: 每裁剪完一个窗口调用一次 callback(index, window, vertices, offsets),
+// window 为 {left, bottom, right, top}, 第 k 个多边形是 vertices[offsets[k], offsets[k + 1]), 都是 dbu 坐标.
+// start_points 和 shape 的单位是 um, 裁剪结果不经过文件
+template<class TCallback> inline void for_each_clip(const std::string& oas_file, const std::string& cell_name, int layer_id,
+    const std::vector<vec2<double>>& start_points, const vec2<double>& shape, TCallback&& callback, int workers = 1
+){
+    py::list points;
+    for (const auto& p : start_points) points.append(py::make_tuple(p[0], p[1]));
+    py::object clips = py_plugin::call<py::object>("klayout_op", "iter_clips", oas_file, layer_id, points, py::make_tuple(shape[0], shape[1]), cell_name,
+        0.0, false, workers);
+    try{
+        for (py::stl_input_iterator<py::object> it(clips), end; it != end; ++it) {
+            py::object item = *it;
+            size_t index = py::extract<size_t>(item[0]);
+            std::array<int64_t, 4> window;
+            for (size_t i = 0; i < window.size(); i++) window[i] = py::extract<int64_t>(item[1][i]);
+            np::ndarray vertices = convert_to<np::ndarray>(item[2][0]);
+            np::ndarray offsets = convert_to<np::ndarray>(item[2][1]);
+            auto [pv, nv] = ndarray_ref_no_padding<vec2<int64_t>>(vertices);
+            auto [po, no] = ndarray_ref_no_padding<vec<int64_t, 1>>(offsets);
+            callback(index, window, std::vector<vec2<int64_t>>(pv, pv + nv), std::vector<int64_t>((int64_t*)po, (int64_t*)po + no));
+        }
+    }
+    catch (py::error_already_set) {
+        PyErr_Print();exit(1);
+    };
+}
+
 template<class T> inline void plot_curves(const std::vector<std::vector<T>>& rowdata, 
     const std::vector<float>& start_x,
     const std::vector<float>& step_x,
@@ -0,0 +1,103 @@
+#pragma once
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <algorithm>
+#include <atomic>
+#include <cstdint>
+#include <cstring>
+#include <string>
+#include <vector>
+#include <stdexcept>
+#include <type_traist_notebook/type_traist.hpp>
+
+// 共享内存帧环的写入端, 布局与 visualizer.py 的 frame_ring_buffer 一致.
+// 求解器线程只做一次 memcpy, 不需要 GIL, 也不创建 ndarray;
+// 可视化进程通过 `visualizer.py --shm <name>` attach 后显示最新的一帧.
+struct shm_frame_writer
+{
+    static constexpr int64_t magic = 0x31474e4952565950; // "PYVRING1"
+    static constexpr size_t header_bytes = 64;
+    static constexpr size_t slot_header_bytes = 64;
+
+    std::string name;
+    size_t slots = 0;
+    size_t slot_bytes = 0;
+    size_t total_bytes = 0;
+    bool unlink_on_close = true;
+    int fd = -1;
+    char* base = nullptr;
+
+    shm_frame_writer(const std::string& shm_name, size_t slot_count, size_t max_frame_bytes, bool unlink = true)
+        : name(shm_name), slots(slot_count), slot_bytes(max_frame_bytes), unlink_on_close(unlink)
+    {
+        if (0 == slots || 0 == slot_bytes) throw std::invalid_argument("shm_frame_writer : empty ring " + name);
+        total_bytes = header_bytes + slots * (slot_header_bytes + slot_bytes);
+        fd = shm_open(posix_name().c_str(), O_CREAT | O_RDWR, 0600);
+        if (fd < 0) throw std::runtime_error("shm_open failed " + name);
+        if (0 != ftruncate(fd, total_bytes)) {
+            close_fd();
+            throw std::runtime_error("ftruncate failed " + name);
+        }
+        void* p = mmap(nullptr, total_bytes, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+        if (MAP_FAILED == p) {
+            close_fd();
+            throw std::runtime_error("mmap failed " + name);
+        }
+        base = reinterpret_cast<char*>(p);
+        int64_t* h = header();
+        h[1] = 1;
+        h[2] = int64_t(slots);
+        h[3] = int64_t(slot_bytes);
+        h[4] = 0;
+        for (size_t i = 0; i < slots; i++) slot_header(i)[0] = 0;
+        std::atomic_thread_fence(std::memory_order_release);
+        h[0] = magic;
+    }
+    shm_frame_writer(const shm_frame_writer&) = delete;
+    shm_frame_writer& operator=(const shm_frame_writer&) = delete;
+    ~shm_frame_writer()
+    {
+        if (nullptr != base) munmap(base, total_bytes);
+        close_fd();
+        if (unlink_on_close) shm_unlink(posix_name().c_str());
+    }
+
+    // shape 的顺序与 create_ndarray_from_vector 相同, {nx, ny} 对应 ndarray 的 (ny, nx)
+    template<class T, class TAlloc> int64_t write(const std::vector<T, TAlloc>& data, std::vector<int> shape)
+    {
+        constexpr const char* str = get_numerical_type_str_suffix<T>();
+        static_assert("" != str);
+        std::reverse(shape.begin(), shape.end());
+        if (shape.empty() || shape.size() > 2) throw std::invalid_argument("shm_frame_writer : only 1d/2d frame is supported");
+        const size_t nbytes = data.size() * sizeof(T);
+        if (nbytes > slot_bytes) throw std::length_error("shm_frame_writer : frame is larger than slot of " + name);
+
+        volatile int64_t* h = header();
+        const int64_t seq = h[4] + 1;
+        volatile int64_t* s = slot_header(size_t(seq) % slots);
+        s[0] = -1;
+        std::atomic_thread_fence(std::memory_order_release);
+        std::memcpy(const_cast<int64_t*>(s) + slot_header_bytes / sizeof(int64_t), data.data(), nbytes);
+        s[1] = int64_t(shape.size());
+        s[2] = shape.at(0);
+        s[3] = 1 < shape.size() ? shape.at(1) : 1;
+        s[4] = int64_t(str[0]);
+        s[5] = int64_t(nbytes);
+        s[6] = seq;
+        std::atomic_thread_fence(std::memory_order_release);
+        s[0] = seq;
+        h[4] = seq;
+        return seq;
+    }
+private:
+    std::string posix_name() const { return '/' == name.front() ? name : "/" + name; }
+    void close_fd()
+    {
+        if (0 <= fd) ::close(fd);
+        fd = -1;
+    }
+    int64_t* header() { return reinterpret_cast<int64_t*>(base); }
+    int64_t* slot_header(size_t i) { return reinterpret_cast<int64_t*>(base + header_bytes + i * (slot_header_bytes + slot_bytes)); }
+};
@@ -4,6 +4,11 @@ import matplotlib.pyplot as plt
 from matplotlib.colors import Normalize
 from matplotlib.widgets import TextBox, Button
 import os
+import queue
+import threading
+import time
+from collections import namedtuple, deque
+import multiprocessing as mp
 
 def add_input_widget(im):
     return
@@ -47,21 +52,27 @@ im = None
 ax = None
 cb = None
 text = None
+im_lod = None
 frame_index = 0
 update_count = 0
-def try_init(data):
-    global im, ax, cb, text
+def try_init(data, stats=None):
+    global im, ax, cb, text, im_lod
     if ax is not None:
         return
+    if stats is None:
+        stats = compute_frame_stats(data)
     plt.ion()
     ax = plt.gca()
     shape = data.shape
     if len(shape) == 2 and 1 == shape[1]:
         [im,] = ax.plot(range(shape[0]), data)
-        ax.set_ylim([np.min(data), np.max(data)])
+        ax.set_ylim([stats.min, stats.max])
     else:
-        norm = Normalize(vmin=np.min(data), vmax=np.max(data))
-        im = ax.imshow(np.real(data), aspect='auto', cmap='jet', norm = norm)
+        norm = Normalize(vmin=stats.min, vmax=stats.max)
+        if lod_mode is not None:
+            im, im_lod = lod_imshow(ax, np.real(data), lod_mode, copy=True, aspect='auto', cmap='jet', norm = norm)
+        else:
+            im = ax.imshow(np.real(data), aspect='auto', cmap='jet', norm = norm)
         ax.xaxis.set_ticks_position('bottom')
         ax.invert_yaxis()
         cb = plt.colorbar(im, ax=ax)
@@ -72,45 +83,698 @@ def try_init(data):
                verticalalignment='top',
                bbox=dict(facecolor='red', alpha=0.5))
     add_input_widget(im)
-def update(data, sync_mode=False):
-    global frame_index, update_count, text
+    if blit_mode: init_blit()
+
+# blit mode: 坐标轴/colorbar 等静态部分只绘制一次并缓存为背景, 每帧只重绘 im 和 text.
+# 窗口缩放或 norm 变化时退回一次全量重绘, 并重新缓存背景.
+blit_mode = False
+blit_background = None
+blit_norm = None
+def set_blit_mode(enable=True):
+    global blit_mode
+    blit_mode = enable
+def current_norm():
+    if cb is not None:
+        return (im.norm.vmin, im.norm.vmax)
+    return tuple(ax.get_ylim())
+def draw_animated_artists():
+    ax.draw_artist(im)
+    ax.draw_artist(text)
+def on_blit_draw(event):
+    global blit_background
+    blit_background = ax.figure.canvas.copy_from_bbox(ax.figure.bbox)
+    draw_animated_artists()
+def on_blit_resize(event):
+    global blit_background
+    blit_background = None
+def init_blit():
+    global blit_background, blit_norm
+    # animated artist 不参与 canvas.draw(), 也不会把 figure 标记为 stale
+    im.set_animated(True)
+    text.set_animated(True)
+    canvas = ax.figure.canvas
+    canvas.mpl_connect('draw_event', on_blit_draw)
+    canvas.mpl_connect('resize_event', on_blit_resize)
+    blit_background, blit_norm = None, None
+def blit_frame():
+    global blit_norm
+    canvas = ax.figure.canvas
+    norm = current_norm()
+    if blit_background is None or norm != blit_norm:
+        # 全量重绘, 由 on_blit_draw 缓存背景并画出 im/text
+        blit_norm = norm
+        canvas.draw()
+    else:
+        canvas.restore_region(blit_background)
+        draw_animated_artists()
+    canvas.blit(ax.figure.bbox)
+    canvas.flush_events()
+
+# level of detail: 按 axes 的屏幕像素尺寸对帧做块降采样 (reshape-mean/max) 后再交给 imshow,
+# 缩放/平移时只对可见窗口重新取样, 窗口小于屏幕像素时直接显示全分辨率的切片.
+# 坐标轴始终使用全分辨率的像素坐标.
+lod_mode = None
+def set_lod_mode(mode='mean'):
+    """
+    设置 update() 和 display_image() 的降采样方式。
+
+    参数:
+        mode (str): 'mean' 块均值, 'max' 块最大值, None 关闭降采样。
+    """
+    global lod_mode
+    assert(mode in (None, 'mean', 'max'))
+    lod_mode = mode
+
+def block_reduce(data, fy, fx, reduce='mean'):
+    h, w = data.shape[0] // fy * fy, data.shape[1] // fx * fx
+    # 切片 + reshape 只改变 strides, 不复制数据
+    blocks = data[:h, :w].reshape((h // fy, fy, w // fx, fx) + data.shape[2:])
+    if 'max' == reduce:
+        return blocks.max(axis=(1, 3))
+    reduced = blocks.mean(axis=(1, 3))
+    if np.issubdtype(data.dtype, np.integer):
+        reduced = reduced.astype(data.dtype)
+    return reduced
+
+class lod_image:
+    def __init__(self, ax, data, reduce='mean', copy=False):
+        self.ax = ax
+        self.im = None
+        self.data = None
+        self.reduce = reduce
+        self.window = None
+        self.store(data, copy)
+    def store(self, data, copy):
+        # 缩放时还要从 data 重新取 tile, 调用方会复用的缓冲区 (c++ 帧, 预读环, complex_field 缓存) 必须复制一份
+        if not copy:
+            self.data = data
+        elif self.data is not None and self.data.shape == data.shape and self.data.dtype == data.dtype and self.data.flags.owndata:
+            np.copyto(self.data, data)
+        else:
+            self.data = np.array(data, copy=True)
+    def view_window(self):
+        h, w = self.data.shape[:2]
+        x0, x1 = sorted(self.ax.get_xlim())
+        y0, y1 = sorted(self.ax.get_ylim())
+        # 像素 i 覆盖 [i - 0.5, i + 0.5]
+        c0, c1 = max(0, int(np.floor(x0 + 0.5))), min(w, int(np.ceil(x1 + 0.5)))
+        r0, r1 = max(0, int(np.floor(y0 + 0.5))), min(h, int(np.ceil(y1 + 0.5)))
+        if c1 <= c0 or r1 <= r0:
+            c0, c1, r0, r1 = 0, w, 0, h
+        bbox = self.ax.get_window_extent()
+        fx = max(1, (c1 - c0) // max(1, int(bbox.width)))
+        fy = max(1, (r1 - r0) // max(1, int(bbox.height)))
+        return c0, c1, r0, r1, fx, fy
+    def tile(self):
+        self.window = self.view_window()
+        c0, c1, r0, r1, fx, fy = self.window
+        c1 = c0 + (c1 - c0) // fx * fx
+        r1 = r0 + (r1 - r0) // fy * fy
+        tile = self.data[r0:r1, c0:c1]
+        if fx > 1 or fy > 1:
+            tile = block_reduce(tile, fy, fx, self.reduce)
+        # origin='upper' 的 extent 为 (left, right, bottom, top)
+        return tile, (c0 - 0.5, c1 - 0.5, r1 - 0.5, r0 - 0.5)
+    def refresh(self, force=False):
+        if not force and self.view_window() == self.window:
+            return False
+        tile, extent = self.tile()
+        self.im.set_data(tile)
+        self.im.set_extent(extent)
+        return True
+    def set_data(self, data, copy=False):
+        self.store(data, copy)
+        self.refresh(force=True)
+    def on_view_changed(self, *args):
+        if self.refresh():
+            self.ax.figure.canvas.draw_idle()
+    def connect(self, im):
+        # 回调只保存弱引用, 由 image 持有 lod 对象
+        self.im = im
+        im.lod = self
+        self.ax.callbacks.connect('xlim_changed', self.on_view_changed)
+        self.ax.callbacks.connect('ylim_changed', self.on_view_changed)
+        self.ax.figure.canvas.mpl_connect('resize_event', self.on_view_changed)
+
+def lod_imshow(ax, data, reduce='mean', copy=False, **kwargs):
+    h, w = data.shape[:2]
+    lod = lod_image(ax, data, reduce, copy)
+    ax.set_xlim(-0.5, w - 0.5)
+    ax.set_ylim(h - 0.5, -0.5)
+    tile, extent = lod.tile()
+    im = ax.imshow(tile, extent=extent, **kwargs)
+    # imshow 会把坐标范围缩到 tile 的 extent, 这里恢复成全图并关闭自动缩放
+    ax.set_xlim(-0.5, w - 0.5)
+    ax.set_ylim(h - 0.5, -0.5)
+    ax.set_autoscale_on(False)
+    lod.connect(im)
+    return im, lod
+
+# frame statistics: min/max/sum (可选 mean 和 NaN 个数), 每个量一次整帧归约;
+# 帧很大时只在跨步采样上统计, 这时所有量都是估计值.
+frame_stats = namedtuple('frame_stats', ['min', 'max', 'sum', 'mean', 'nan_count', 'sample_step'])
+stats_with_nan = False
+stats_sample_size = 1 << 22
+last_stats = None
+def set_frame_stats_options(with_nan=False, sample_size=1 << 22):
+    """
+    设置状态栏统计方式。
+
+    参数:
+        with_nan (bool): 是否统计 NaN 个数 (min/max/sum 会忽略 NaN); False 时帧中有 NaN 则 min/max/sum 为 NaN。
+        sample_size (int): 元素数超过该值时在跨步采样上统计, None 表示总是全量统计。
+    """
+    global stats_with_nan, stats_sample_size
+    stats_with_nan, stats_sample_size = with_nan, sample_size
+
+def compute_frame_stats(data, with_nan=False, sample_size=None):
+    flat = np.ravel(np.real(data))
+    step = 1
+    if sample_size is not None and flat.size > sample_size:
+        step = -(-flat.size // sample_size)
+        flat = flat[::step]
+    nan_count = 0
+    if with_nan:
+        mask = np.isnan(flat)
+        nan_count = int(np.count_nonzero(mask))
+        if nan_count:
+            flat = flat[~mask]
+    if 0 == flat.size:
+        return frame_stats(np.nan, np.nan, 0.0, np.nan, nan_count * step, step)
+    # 不统计 NaN 时与 np.min/np.max 一致, 任意一个 NaN 让 min/max/sum 都为 NaN
+    # numpy 的 sum 按 pairwise 求和, float32 上误差也很小, 不需要转成 float64 (会多一次转换)
+    lb, ub, total = float(flat.min()), float(flat.max()), float(flat.sum())
+    # 采样时按步长估计全帧的和与 NaN 个数
+    return frame_stats(lb, ub, total * step, total / flat.size, nan_count * step, step)
+
+def get_frame_stats():
+    return last_stats
+
+# autoscale: 数据范围超出当前 norm, 或明显小于 norm 范围时, 用最新统计量重设 norm,
+# 避免初始化时固定的 norm 在若干帧之后饱和.
+autoscale_mode = False
+autoscale_margin = 0.05
+autoscale_shrink = 0.5
+def set_autoscale(enable=True, margin=0.05, shrink=0.5):
+    """
+    设置 update() 是否根据帧统计量自动调整 colormap 范围。
+
+    参数:
+        enable (bool): 是否开启。
+        margin (float): 重设时在数据范围两端留出的比例。
+        shrink (float): 数据范围小于 norm 范围的该比例时收缩 norm。
+    """
+    global autoscale_mode, autoscale_margin, autoscale_shrink
+    autoscale_mode, autoscale_margin, autoscale_shrink = enable, margin, shrink
+
+def autoscale_range(stats, vmin, vmax):
+    # 返回新的 (vmin, vmax), 不需要调整时返回 None
+    if not np.isfinite(stats.min) or not np.isfinite(stats.max): return None
+    span = stats.max - stats.min
+    if stats.min >= vmin and stats.max <= vmax and span >= autoscale_shrink * (vmax - vmin):
+        return None
+    pad = max(span, abs(stats.max), 1e-12) * autoscale_margin
+    return stats.min - pad, stats.max + pad
+
+def autoscale_norm(stats):
+    limits = autoscale_range(stats, *current_norm())
+    if limits is None: return False
+    if cb is not None:
+        im.norm.vmin, im.norm.vmax = limits
+    else:
+        ax.set_ylim(limits)
+    return True
+
+# complex field views
+# 复数帧按所选视图 (实部/虚部/幅值/相位/对数功率) 转成实数后显示.
+# 幅值/相位/对数功率写入预分配的 float32 缓冲区, 同一帧切换视图时直接复用已算好的结果.
+complex_views = ('real', 'imag', 'magnitude', 'phase', 'log_power')
+class complex_field:
+    def __init__(self, data=None):
+        self.data = None
+        self.buffers = {}
+        self.cached = set()
+        if data is not None: self.set_data(data)
+    def set_data(self, data, copy=False):
+        # 之后切换视图还要从 data 计算; 调用方会复用的缓冲区 (c++ 帧) 需要复制, 实数帧只显示当前视图, 不需要保留
+        if copy and np.iscomplexobj(data):
+            owned = self.buffers.get('data')
+            if owned is None or owned.shape != data.shape or owned.dtype != data.dtype:
+                owned = self.buffers['data'] = np.empty(data.shape, data.dtype)
+            np.copyto(owned, data)
+            data = owned
+        self.data = data
+        self.cached = set()
+        return self
+    def buffer(self, name):
+        buf = self.buffers.get(name)
+        if buf is None or buf.shape != self.data.shape:
+            buf = self.buffers[name] = np.empty(self.data.shape, np.float32)
+        return buf
+    def view(self, name='real'):
+        data = self.data
+        if name not in complex_views:
+            raise ValueError(f"unknown complex view {name}, expect one of {complex_views}")
+        if not np.iscomplexobj(data) or 'real' == name:
+            return np.real(data)
+        if 'imag' == name:
+            return data.imag
+        if name in self.cached:
+            return self.buffers[name]
+        buf = self.buffer(name)
+        if 'magnitude' == name:
+            np.abs(data, out=buf)
+        elif 'phase' == name:
+            np.arctan2(data.imag, data.real, out=buf)
+        else:
+            # 20 * log10(|z|) == 10 * log10(|z|^2), 复用幅值缓冲区
+            np.maximum(self.view('magnitude'), np.finfo(np.float32).tiny, out=buf)
+            np.log10(buf, out=buf)
+            buf *= 20
+        self.cached.add(name)
+        return buf
+
+complex_view = 'real'
+live_field = complex_field()
+def set_complex_view(name='real'):
+    """
+    设置复数帧的显示方式, 已显示的帧立即切换 (使用缓存的结果)。
+    async 渲染模式下需要在第一次 update() 之前设置。
+
+    参数:
+        name (str): 'real', 'imag', 'magnitude', 'phase' 或 'log_power'。
+    """
+    global complex_view
+    if name not in complex_views:
+        raise ValueError(f"unknown complex view {name}, expect one of {complex_views}")
+    complex_view = name
+    if im is None or cb is None or not np.iscomplexobj(live_field.data): return
+    shown = live_field.view(name)
+    if im_lod is not None:
+        im_lod.set_data(shown, copy=True)
+    else:
+        im.set_array(shown)
+    stats = compute_frame_stats(shown, sample_size=stats_sample_size)
+    im.norm.vmin, im.norm.vmax = stats.min, stats.max
+    if blit_mode:
+        blit_frame()
+    else:
+        plt.draw()
+
+# frame timing
+# 记录每帧各阶段耗时 (秒), 保留最近 window 帧用于直方图/统计.
+#   outside   : 上一次 update() 返回到这一次调用之间, 即求解器和 c++ 桥接的耗时
+#   convert   : 复数视图转换
+#   stats     : 帧统计
+#   init      : 首帧创建 figure
+#   set_array : 更新图像数据
+#   draw      : 重绘 (非 blit 模式下只是 draw_idle, 真正的绘制发生在 pause 中)
+#   pause     : 事件循环
+#   submit    : async 模式下入队
+class frame_timer:
+    stages = ('outside', 'convert', 'stats', 'init', 'set_array', 'draw', 'pause', 'submit', 'total')
+    def __init__(self, window=1000):
+        self.records = deque(maxlen=window)
+        self.current = None
+        self.last_end = None
+        self.count = 0
+    def begin(self):
+        if self.current is not None: return False
+        now = time.perf_counter()
+        self.current = {'frame': self.count}
+        if self.last_end is not None:
+            self.current['outside'] = now - self.last_end
+        self.start = self.mark_time = now
+        return True
+    def mark(self, stage):
+        if self.current is None: return
+        now = time.perf_counter()
+        self.current[stage] = self.current.get(stage, 0.0) + now - self.mark_time
+        self.mark_time = now
+    def end(self):
+        if self.current is None: return
+        self.last_end = time.perf_counter()
+        self.current['total'] = self.last_end - self.start
+        self.records.append(self.current)
+        self.current = None
+        self.count = self.count + 1
+    def samples(self, stage):
+        return np.array([r[stage] for r in self.records if stage in r], np.float64)
+    def histogram(self, stage='total', bins=20):
+        return np.histogram(self.samples(stage), bins=bins)
+    def summary(self):
+        result = {}
+        for stage in self.stages:
+            x = self.samples(stage)
+            if 0 == x.size: continue
+            result[stage] = {
+                'count': int(x.size),
+                'mean': float(x.mean()),
+                'p50': float(np.percentile(x, 50)),
+                'p95': float(np.percentile(x, 95)),
+                'max': float(x.max())
+            }
+        return result
+    def dump(self, path):
+        if path.lower().endswith('.csv'):
+            import csv
+            with open(path, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=('frame',) + self.stages)
+                writer.writeheader()
+                writer.writerows(self.records)
+        else:
+            import json
+            with open(path, 'w') as f:
+                json.dump({'summary': self.summary(), 'frames': list(self.records)}, f, indent=1)
+        print(f"    frame timing saved to {path}")
+
+frame_timing = None
+frame_timing_dump = None
+def set_frame_timing(enable=True, window=1000, dump_path=None):
+    """
+    开启/关闭 update() 的逐帧耗时统计。
+
+    参数:
+        enable (bool): 是否开启。
+        window (int): 保留最近的帧数。
+        dump_path (str): close_plot() 时保存的文件, 以 .csv 结尾保存为 CSV, 否则为 JSON。
+    """
+    global frame_timing, frame_timing_dump
+    frame_timing = frame_timer(window) if enable else None
+    frame_timing_dump = dump_path
+
+def get_frame_timing():
+    return frame_timing
+
+def timing_begin():
+    return frame_timing is not None and frame_timing.begin()
+def timing_mark(stage):
+    if frame_timing is not None: frame_timing.mark(stage)
+def timing_end():
+    if frame_timing is not None: frame_timing.end()
+
+def dump_frame_timing(suffix=''):
+    if frame_timing is None or frame_timing_dump is None: return
+    root, ext = os.path.splitext(frame_timing_dump)
+    frame_timing.dump(root + suffix + ext)
+
+def draw_frame(data):
+    global frame_index, update_count, text, last_stats
+    started = timing_begin()
     update_count = update_count + 1
     [xsize, ysize] = data.shape
-    lb, ub = np.min(data), np.max(data)
+    data = live_field.set_data(data, copy=True).view(complex_view)
+    timing_mark('convert')
+    stats = compute_frame_stats(data, stats_with_nan, stats_sample_size)
+    last_stats = stats
+    lb, ub = stats.min, stats.max
+    timing_mark('stats')
     
     # Update the image data (use a 1D slice of the matrix for simplicity)
     # data = data[xsize // 2]
     # ysize = 1
     
-    try_init(data)
-    text.set_text(f"frame-{frame_index} range:({lb:.2f},{ub:.2f}) sum:{np.sum(data):.2f}")
+    try_init(data, stats)
+    timing_mark('init')
+    # 跨步采样时 range/sum/NaN 个数都是估计值 (初始 norm 和 autoscale 也用它们), 用 ≈ 标出
+    approx = '≈' if stats.sample_step > 1 else ':'
+    status = f"frame-{frame_index} range{approx}({lb:.2f},{ub:.2f}) sum{approx}{stats.sum:.2f}"
+    if stats_with_nan:
+        status = status + f" mean:{stats.mean:.2f} nan{approx}{stats.nan_count}"
+    text.set_text(status)
     frame_index = frame_index + 1
     
     if ysize == 1: 
         im.set_ydata(data)
+    elif im_lod is not None:
+        im_lod.set_data(data, copy=True)
     else:
         # data = (data - lb)/(ub -lb)
         im.set_array(data)
     
-    # im.norm = Normalize(vmin=lb, vmax=ub)
-    # cb.update_normal(im) 
-    plt.draw()
+    if autoscale_mode:
+        autoscale_norm(stats)
+    timing_mark('set_array')
+    if blit_mode:
+        blit_frame()
+    else:
+        plt.draw()
+    timing_mark('draw')
+    if 'frame' == motion_window: flush_motion()
+    if started: timing_end()
+
+def update(data, sync_mode=False):
+    timing_begin()
+    if live_recorder is not None:
+        live_recorder.append(data)
+    if render_mode == 'async':
+        # 只入队, 不在调用线程上绘图
+        start_render_worker()
+        render_worker.submit(data)
+        dispatch_render_events()
+        timing_mark('submit')
+        timing_end()
+        if sync_mode:
+            render_worker.wait_closed()
+            dispatch_render_events()
+        return
+    draw_frame(data)
     
     if sync_mode:
+        timing_end()
         plt.ioff()
         plt.show(block=True)
     else:
         plt.pause(0.1)
+        timing_mark('pause')
+        timing_end()
 
 # Function to clean up and close the plot
 def close_plot():
+    dump_frame_timing()
+    set_frame_recording(None)
+    if render_worker is not None:
+        stop_render_worker()
+        return
     plt.close()
 
+# asynchronous render worker
+# update() 只把帧放进有界队列, 由独立的渲染进程消费并绘图.
+# 队列满时丢弃最旧的帧, 渲染进程每次只画最新的一帧.
+# matplotlib 的 GUI 后端只能在一个线程里驱动, 所以这里用进程而不是线程.
+def mp_context():
+    # fork 不会重新导入宿主(c++)进程的 __main__, 嵌入式解释器下更安全
+    methods = mp.get_all_start_methods()
+    return mp.get_context('fork' if 'fork' in methods else methods[0])
+
+render_mode = 'sync'
+render_queue_size = 2
+render_interval = 0.01
+render_worker = None
+
+class frame_render_worker:
+    def __init__(self, queue_size=2, interval=0.01):
+        ctx = mp_context()
+        self.frames = ctx.Queue(maxsize=max(1, int(queue_size)))
+        self.events = ctx.Queue()
+        self.closed = ctx.Event()
+        self.dropped = ctx.Value('q', 0)
+        self.process = ctx.Process(
+            target=render_loop,
+            args=(self.frames, self.events, self.closed, self.dropped, interval),
+            daemon=True
+        )
+        self.process.start()
+    def submit(self, data):
+        if self.closed.is_set(): return False
+        # 队列的 feeder 线程在 update() 返回之后才 pickle, 调用方 (c++) 的缓冲区那时可能已被复用或释放
+        data = np.array(data, copy=True)
+        while True:
+            try:
+                self.frames.put_nowait(data)
+                return True
+            except queue.Full:
+                pass
+            # drop oldest
+            try:
+                self.frames.get_nowait()
+                self.count_dropped(1)
+            except queue.Empty:
+                pass
+    def count_dropped(self, n):
+        with self.dropped.get_lock():
+            self.dropped.value += n
+    def dropped_frames(self):
+        return int(self.dropped.value)
+    def is_closed(self):
+        return self.closed.is_set() or not self.process.is_alive()
+    def wait_closed(self):
+        while not self.is_closed():
+            self.closed.wait(0.1)
+    def poll_events(self):
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+    def stop(self, timeout=1.0):
+        self.closed.set()
+        try:
+            self.frames.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+
+def render_loop(frames, events, closed, dropped, interval):
+    global render_worker, render_mode
+    # 子进程内部总是同步绘制
+    render_worker, render_mode = None, 'sync'
+    def forward_click(button, flag, x, y):
+        events.put(('click', button, flag, x, y))
+    def forward_motion(x, y, dx, dy):
+        events.put(('motion', x, y, dx, dy))
+    def on_close(event):
+        closed.set()
+    try:
+        while not closed.is_set():
+            try:
+                data = frames.get(timeout=interval)
+            except queue.Empty:
+                if ax is not None: plt.pause(interval)
+                continue
+            # 只保留最新的帧
+            skipped = 0
+            while data is not None:
+                try:
+                    newer = frames.get_nowait()
+                except queue.Empty:
+                    break
+                if newer is not None: skipped = skipped + 1
+                data = newer
+            if skipped:
+                with dropped.get_lock():
+                    dropped.value += skipped
+            if data is None: break
+            first_frame = ax is None
+            draw_frame(data)
+            text.set_text(text.get_text() + f" dropped:{dropped.value}")
+            if first_frame:
+                regist_on_close(on_close)
+                regist_click_and_motion(forward_click, forward_motion)
+            plt.pause(interval)
+    finally:
+        closed.set()
+        dump_frame_timing('.render')
+        plt.close('all')
+
+def set_render_mode(mode='sync', queue_size=2, interval=0.01):
+    """
+    设置 update() 的渲染模式。
+
+    参数:
+        mode (str): 'sync' 在调用线程上绘制并 pause; 'async' 只入队, 由渲染进程绘制。
+        queue_size (int): 帧队列长度, 满时丢弃最旧的帧。
+        interval (float): 渲染进程的事件循环间隔 (秒)。
+    """
+    global render_mode, render_queue_size, render_interval
+    assert(mode in ('sync', 'async'))
+    if mode != render_mode and render_worker is not None:
+        stop_render_worker()
+    render_mode, render_queue_size, render_interval = mode, queue_size, interval
+
+def start_render_worker():
+    global render_worker, close_notified
+    if render_worker is None:
+        close_notified = False
+        render_worker = frame_render_worker(render_queue_size, render_interval)
+    return render_worker
+
+def stop_render_worker():
+    global render_worker
+    if render_worker is None: return
+    dispatch_render_events()
+    render_worker.stop()
+    render_worker = None
+
+def get_dropped_frames():
+    return 0 if render_worker is None else render_worker.dropped_frames()
+
+# 渲染进程中的鼠标/关闭事件在下一次 update() 时回到调用线程上执行
+click_callback, motion_callback, close_callback = None, None, None
+close_notified = False
+def dispatch_render_events():
+    global close_notified
+    if render_worker is None: return
+    for event in render_worker.poll_events():
+        if 'click' == event[0]:
+            if None != click_callback: click_callback(*event[1:])
+        elif 'motion' == event[0]:
+            if None != motion_callback: motion_callback(*event[1:])
+    if render_worker.is_closed() and not close_notified:
+        close_notified = True
+        if None != close_callback: close_callback(None)
+
 # regist event
 mouse_pressed = False
 start_x, start_y = None, None
 move_x, move_y= None, None
+
+# motion coalescing
+# 拖动时把时间窗口 (或一帧) 内的位移合并成一次 (x, y, dx, dy) 回调, (x, y) 为窗口内第一次移动的起点.
+# 松开鼠标时总是先把剩余的位移回调出去.
+motion_window = None
+pending_motion = None
+motion_sink = None
+motion_timer = None
+last_motion_flush = 0.0
+def set_motion_coalescing(window=0.05):
+    """
+    设置鼠标拖动回调的合并方式。
+
+    参数:
+        window: None 每个事件都回调; 秒数 (float) 在该时间窗口内合并; 'frame' 每次 update() 合并一次。
+    """
+    global motion_window
+    assert(window is None or 'frame' == window or 0 < float(window))
+    motion_window = window
+
+def flush_motion():
+    global pending_motion, last_motion_flush
+    last_motion_flush = time.perf_counter()
+    if pending_motion is None: return
+    x, y, dx, dy = pending_motion
+    pending_motion = None
+    motion_sink(x, y, dx, dy)
+
+def coalesce_motion(x, y, dx, dy):
+    global pending_motion, motion_timer
+    if pending_motion is None:
+        pending_motion = [x, y, dx, dy]
+    else:
+        pending_motion[2] += dx
+        pending_motion[3] += dy
+    if 'frame' == motion_window: return
+    if time.perf_counter() - last_motion_flush >= motion_window:
+        flush_motion()
+    elif motion_timer is None:
+        # 窗口结束后没有新的事件时, 由定时器把剩余的位移回调出去
+        def on_timer():
+            global motion_timer
+            motion_timer = None
+            flush_motion()
+        motion_timer = ax.figure.canvas.new_timer(interval=max(1, int(motion_window * 1000)))
+        motion_timer.single_shot = True
+        motion_timer.add_callback(on_timer)
+        motion_timer.start()
+
 def regist_click_and_motion(click = None, motion = None):
+    global click_callback, motion_callback, motion_sink
+    if render_mode == 'async':
+        click_callback, motion_callback = click, motion
+        return
     def clamp(value, min_value, max_value):
         return max(min_value, min(value, max_value))
     def to_data_coord(px, py):
@@ -125,6 +789,7 @@ def regist_click_and_motion(click = None, motion = None):
         mouse_pressed = True
         start_x, start_y = event.xdata, event.ydata
         move_x, move_y = start_x, start_y 
+        flush_motion()
         if None != click : 
             click(int(event.button), int(0), float(start_x), float(start_y))
         else:
@@ -132,6 +797,7 @@ def regist_click_and_motion(click = None, motion = None):
     def on_button_release(event):
         global mouse_pressed, start_x, start_y, move_x, move_y
         if not mouse_pressed: return
+        flush_motion()
         data_x, data_y = to_data_coord(event.x, event.y)
         if None != click : 
             click(int(event.button), int(1), float(data_x), float(data_y))
@@ -140,31 +806,42 @@ def regist_click_and_motion(click = None, motion = None):
         mouse_pressed = False
         start_x, start_y = None, None
         move_x, move_y = None,None
+    def emit_motion(x, y, dx, dy):
+        if None != motion : 
+            motion(float(x), float(y), float(dx), float(dy))
+        else : 
+            print(f'move    from point ({x:.2f}, {y:.2f}) \t dir ({dx:.2f}, {dy:.2f}) ')
     def on_motion(event):
         global move_x, move_y
         if not mouse_pressed or not event.inaxes: return 
         dx = event.xdata - move_x
         dy = event.ydata - move_y
-        if None != motion : 
-            motion(float(move_x), float(move_y), float(dx), float(dy))
-        else : 
-            print(f'move    from point ({move_x:.2f}, {move_y:.2f}) \t dir ({dx:.2f}, {dy:.2f}) ')
+        if motion_window is None:
+            emit_motion(move_x, move_y, dx, dy)
+        else:
+            coalesce_motion(move_x, move_y, dx, dy)
         move_x, move_y = event.xdata, event.ydata
+    motion_sink = emit_motion
         
     ax.figure.canvas.mpl_connect('button_press_event', on_button_press)
     ax.figure.canvas.mpl_connect('motion_notify_event', on_motion)
     ax.figure.canvas.mpl_connect('button_release_event', on_button_release) 
 def regist_on_close(callback_on_close):
+    global close_callback
+    if render_mode == 'async':
+        close_callback = callback_on_close
+        return
     cid = ax.figure.canvas.mpl_connect('close_event', callback_on_close)
 def regist_mouse_event(click, motion):
     regist_click_and_motion(click, motion)
 
-def display_image(matrix):
+def display_image(matrix, view='real'):
     """
     显示一个 NumPy 矩阵作为图像或曲线。
     
     参数:
         matrix (numpy.ndarray): 输入的矩阵，可以是灰度图像 (2D)、彩色图像 (3D) 或Nx1/一维数据。
+        view (str): 复数矩阵的显示方式, 见 complex_views。图像窗口中按 'm' 切换。
     """
     if not isinstance(matrix, np.ndarray):
         raise TypeError("Input must be a NumPy array.")
@@ -182,82 +859,284 @@ def display_image(matrix):
     else:
         # 显示图像
         ax = plt.gca()
-        im = ax.imshow(np.real(matrix), aspect='auto', cmap='jet')
-        ax.xaxis.set_ticks_position('bottom')
-        ax.invert_yaxis()  # 图像坐标系反向
-        
-        # 动态计算刻度间隔（保持原逻辑）
-        NX = int(matrix.shape[1] / 10)
-        NY = int(matrix.shape[0] / 10)
-        interval = max(1, min(NX, NY))  # 确保最小间隔为1
-        ax.set_xticks(np.arange(0, matrix.shape[1], interval))
-        ax.set_yticks(np.arange(0, matrix.shape[0], interval))
-        
-        # 添加颜色条
-        cb = plt.colorbar(im, ax=ax)
-        cb.set_label('Intensity')
+        field = complex_field(matrix)
+        image = field.view(view)
+        if lod_mode is not None:
+            im, _ = lod_imshow(ax, image, lod_mode, aspect='auto', cmap='jet')
+        else:
+            im = ax.imshow(image, aspect='auto', cmap='jet')
+        format_image_axes(ax, im, matrix.shape)
         add_input_widget(im)  # 保持原有交互功能
+        if np.iscomplexobj(matrix):
+            connect_complex_view_key(ax, im, field, view)
 
     plt.show()
 
-def plot_curves(lines, start_x=None, step_x=None, legends=None, types=None, sample_rate=1.0):
-    """
-    绘制曲线。
-
-    参数：
-        lines (list of list): 曲线数据的列表，其中每个子列表表示一条曲线。
-        start_x (list, optional): 长度为 n 的列表，表示每条曲线的起始点 x。默认为 None。
-        step_x (list, optional): 长度为 n 的列表，表示每条曲线的 x 步长。默认为 None。
-        legends (list, optional): 长度为 n 的列表，表示每条曲线的图例。默认为 None。
-        types (list, optional): 长度为 n 的列表，表示每条曲线的绘制方式。默认为 None。
-        sample_rate (float, optional): 0-1 之间的浮点数，表示采样率。默认为 1.0 (不采样)。
-    """
-
-    n = len(lines)  # 曲线的数量
-
-    if start_x is None:
-        start_x = [0] * n
-    if step_x is None:
-        step_x = [1] * n
-    if legends is None:
-        legends = [f'Curve {i}' for i in range(n)]
-    if types is None:
-        types = ['-'] * n
-
-    for i in range(n):
-        y = np.array(lines[i])  # 将list转化为numpy array
-        m = len(y) # 获取当前曲线的点数
-        x = np.array([start_x[i] + j * step_x[i] for j in range(m)])
-
-        if sample_rate < 1.0:
-            sample_size = int(m * sample_rate)
-            if sample_size < 2:
-                sample_size = 2  # 确保采样后的点数至少为 2
-            sample_indices = np.random.choice(m, size=sample_size, replace=False)
-            sample_indices.sort()
-            x = x[sample_indices]
-            y = y[sample_indices]
-
-        plt.plot(x, y, types[i], label=legends[i])
-
-    plt.legend(loc='upper right')
-    plt.xlabel('X')
-    plt.ylabel('Y')
-    plt.title('Curves')
-    plt.grid(True)
-    plt.show()
+def connect_complex_view_key(ax, im, field, view):
+    state = {'view': view}
+    ax.set_title(view)
+    def on_key(event):
+        if 'm' != event.key: return
+        i = complex_views.index(state['view'])
+        state['view'] = complex_views[(i + 1) % len(complex_views)]
+        image = field.view(state['view'])
+        if hasattr(im, 'lod'):
+            im.lod.set_data(image)
+        else:
+            im.set_data(image)
+        stats = compute_frame_stats(image, sample_size=stats_sample_size)
+        im.set_clim(stats.min, stats.max)
+        ax.set_title(state['view'])
+        ax.figure.canvas.draw_idle()
+    ax.figure.canvas.mpl_connect('key_press_event', on_key)
 
-def load_binary_image_file(path, shape, pixel_type):
-    def to_np_type(s):
-        dtype_map = {
-            'c': np.complex64,
-            'z': np.complex128,
-            'f': np.float32,
-            'd': np.float64,
-            'n': np.int32,
-            '' : np.float32
-        }
-        return dtype_map[s]
+def format_image_axes(ax, im, shape):
+    ax.xaxis.set_ticks_position('bottom')
+    ax.invert_yaxis()  # 图像坐标系反向
+    
+    # 动态计算刻度间隔（保持原逻辑）
+    NX = int(shape[1] / 10)
+    NY = int(shape[0] / 10)
+    interval = max(1, min(NX, NY))  # 确保最小间隔为1
+    ax.set_xticks(np.arange(0, shape[1], interval))
+    ax.set_yticks(np.arange(0, shape[0], interval))
+    
+    # 添加颜色条
+    cb = ax.figure.colorbar(im, ax=ax)
+    cb.set_label('Intensity')
+    return cb
+
+# headless export
+# 不经过 pyplot, 直接用 Agg canvas 绘制, 不需要显示器.
+# 每个工作进程只创建一次 figure, 之后每帧只替换图像数据并保存.
+export_figure = None
+export_stack = None
+def get_export_figure(shape, figsize, dpi, vmin, vmax):
+    global export_figure
+    key = (tuple(shape), figsize, dpi)
+    if export_figure is None or export_figure[0] != key:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(111)
+        im = ax.imshow(np.zeros(shape[:2], np.float32), aspect='auto', cmap='jet',
+            norm=Normalize(vmin=vmin, vmax=vmax))
+        format_image_axes(ax, im, shape)
+        export_figure = (key, fig, im)
+    return export_figure[1], export_figure[2]
+
+def export_frame_source(source, index):
+    global export_stack
+    if isinstance(source, tuple):
+        # 图像栈只传路径, 由工作进程自己 memmap, 避免把整帧序列化
+        if export_stack is None or export_stack[0] != source:
+            export_stack = (source, binary_image_stack(*source))
+        return export_stack[1][index]
+    return source
+
+def export_frame_to_png(task):
+    index, source, path, figsize, dpi, vmin, vmax = task
+    frame = np.real(export_frame_source(source, index))
+    fig, im = get_export_figure(frame.shape, figsize, dpi, vmin, vmax)
+    im.set_data(frame)
+    if vmin is None or vmax is None:
+        stats = compute_frame_stats(frame, sample_size=stats_sample_size)
+        im.set_clim(stats.min if vmin is None else vmin, stats.max if vmax is None else vmax)
+    fig.savefig(path)
+    return path
+
+def export_frames(frames, output, fps=10.0, workers=None, vmin=None, vmax=None, figsize=None, dpi=100):
+    """
+    无显示器环境下批量把帧渲染成 PNG 或 MP4, 颜色映射/坐标方向/颜色条与 display_image 一致。
+
+    参数:
+        frames: 2D ndarray 的列表, 3D ndarray (N, H, W), 或 binary_image_stack。
+        output (str): 输出目录 (逐帧保存为 frame_00000.png ...), 或以 .mp4 结尾的视频路径。
+        fps (float): 视频帧率。
+        workers (int): 进程池大小, 默认 CPU 数。
+        vmin, vmax (float): 固定的颜色范围, 为 None 时逐帧按数据范围。
+        figsize (tuple): 图像尺寸 (英寸), 默认 matplotlib 的设置。
+        dpi (int): 分辨率。
+    返回:
+        输出的文件路径列表 (PNG) 或视频路径 (MP4)。
+    """
+    import tempfile
+    import shutil
+    import subprocess
+    from concurrent.futures import ProcessPoolExecutor
+    to_video = output.lower().endswith('.mp4')
+    if to_video and shutil.which('ffmpeg') is None:
+        raise RuntimeError("ffmpeg not found, can't export mp4")
+    png_dir = tempfile.mkdtemp() if to_video else output
+    os.makedirs(png_dir, exist_ok=True)
+
+    if isinstance(frames, binary_image_stack):
+        n, source = len(frames), frames.args
+        sources = [source] * n
+    else:
+        n, sources = len(frames), frames
+    tasks = [
+        (i, sources[i], os.path.join(png_dir, f"frame_{i:05d}.png"), figsize, dpi, vmin, vmax)
+        for i in range(n)
+    ]
+    workers = workers or os.cpu_count() or 1
+    print(f"    export {n} frames to {output} with {workers} workers")
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context()) as pool:
+            paths = list(pool.map(export_frame_to_png, tasks, chunksize=max(1, n // (4 * workers))))
+        if not to_video:
+            return paths
+        cmd = ['ffmpeg', '-y', '-loglevel', 'error', '-framerate', str(fps),
+            '-i', os.path.join(png_dir, 'frame_%05d.png'),
+            '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p', output]
+        subprocess.run(cmd, check=True)
+        return output
+    finally:
+        if to_video: shutil.rmtree(png_dir, ignore_errors=True)
+
+# dashboard
+# 多个命名面板 (图像或曲线) 放在同一个 figure 中, 一次 update 更新所有传入的面板,
+# 只做一次 canvas 重绘和一次事件循环.
+class dashboard_panel:
+    def __init__(self, name, kind='image', view='real', title=None, autoscale=True):
+        assert(kind in ('image', 'curve'))
+        self.name = name
+        self.kind = kind
+        self.view = view
+        self.title = title or name
+        self.autoscale = autoscale
+        self.field = complex_field()
+        self.ax = None
+        self.artist = None
+    def create(self, ax, data, stats):
+        self.ax = ax
+        ax.set_title(self.title)
+        if 'curve' == self.kind:
+            [self.artist,] = ax.plot(np.arange(data.size), data)
+            ax.set_ylim(autoscale_range(stats, np.inf, -np.inf) or (0, 1))
+            ax.grid(True)
+        else:
+            norm = Normalize(vmin=stats.min, vmax=stats.max)
+            self.artist = ax.imshow(data, aspect='auto', cmap='jet', norm=norm)
+            ax.xaxis.set_ticks_position('bottom')
+            ax.invert_yaxis()
+            ax.figure.colorbar(self.artist, ax=ax)
+    def set_data(self, ax, data):
+        data = self.field.set_data(data).view(self.view)
+        if 'curve' == self.kind:
+            data = np.ravel(data)
+        stats = compute_frame_stats(data, sample_size=stats_sample_size)
+        if self.ax is None:
+            self.create(ax, data, stats)
+            return stats
+        if 'curve' == self.kind:
+            if data.size != self.artist.get_xdata().size:
+                self.artist.set_data(np.arange(data.size), data)
+                self.ax.set_xlim(0, max(1, data.size - 1))
+            else:
+                self.artist.set_ydata(data)
+            limits = autoscale_range(stats, *self.ax.get_ylim()) if self.autoscale else None
+            if limits is not None: self.ax.set_ylim(limits)
+        else:
+            self.artist.set_array(data)
+            norm = self.artist.norm
+            limits = autoscale_range(stats, norm.vmin, norm.vmax) if self.autoscale else None
+            if limits is not None: norm.vmin, norm.vmax = limits
+        return stats
+
+class dashboard:
+    def __init__(self, ncols=2, title=None):
+        self.ncols = ncols
+        self.title = title
+        self.panels = {}
+        self.fig = None
+        self.axes = {}
+        self.frame_index = 0
+    def add_panel(self, name, kind='image', view='real', title=None, autoscale=True):
+        # figure 创建之后不能再添加面板
+        assert(self.fig is None)
+        self.panels[name] = dashboard_panel(name, kind, view, title, autoscale)
+    def create_figure(self):
+        plt.ion()
+        n = len(self.panels)
+        ncols = max(1, min(self.ncols, n))
+        nrows = -(-n // ncols)
+        self.fig = plt.figure(figsize=(5 * ncols, 4 * nrows))
+        if self.title: self.fig.suptitle(self.title)
+        for i, name in enumerate(self.panels):
+            self.axes[name] = self.fig.add_subplot(nrows, ncols, i + 1)
+    def is_closed(self):
+        return self.fig is not None and not plt.fignum_exists(self.fig.number)
+    def update(self, frames, interval=0.1):
+        if self.fig is None: self.create_figure()
+        for name, data in frames.items():
+            if name not in self.panels:
+                raise KeyError(f"unknown panel {name}, regist it with add_panel first")
+            self.panels[name].set_data(self.axes[name], np.asarray(data))
+        self.frame_index = self.frame_index + 1
+        self.fig.canvas.draw_idle()
+        plt.pause(interval)
+        return not self.is_closed()
+    def close(self):
+        if self.fig is not None: plt.close(self.fig)
+        self.fig = None
+
+live_dashboard = None
+def regist_panel(name, kind='image', view='real', title=None, ncols=2):
+    """
+    在默认 dashboard 中注册一个面板, 之后用 update_panels 批量更新。
+
+    参数:
+        name (str): 面板名称, 同时也是 update_panels 中的键。
+        kind (str): 'image' 或 'curve'。
+        view (str): 复数数据的显示方式, 见 complex_views。
+        title (str): 面板标题, 默认为 name。
+        ncols (int): 每行面板数。
+    """
+    global live_dashboard
+    if live_dashboard is None: live_dashboard = dashboard(ncols)
+    live_dashboard.add_panel(name, kind, view, title)
+
+def update_panels(frames, interval=0.1):
+    """
+    用 {面板名: ndarray} 更新默认 dashboard 中对应的面板, 只重绘一次。
+    返回窗口是否仍然打开。
+    """
+    return live_dashboard.update(dict(frames), interval)
+
+def import_core_plugin(name):
+    # 安装后 core_plugins 与 visualizer.py 在同一目录 (见 CMakeLists.txt)
+    import importlib, sys
+    plugins_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'core_plugins')
+    if plugins_dir not in sys.path:
+        sys.path.append(plugins_dir)
+    return importlib.import_module(name)
+
+def plot_curves(lines, start_x=None, step_x=None, legends=None, types=None, sample_rate=1.0, decimate='minmax'):
+    """
+    绘制曲线, 实现 (包括降采样) 在 core_plugins/plot_curves.py, 参数同那里的 plot_curves。
+    """
+    return import_core_plugin('plot_curves').plot_curves(lines, start_x, step_x, legends, types, sample_rate, decimate)
+
+def to_np_type(s):
+    dtype_map = {
+        'c': np.complex64,
+        'z': np.complex128,
+        'f': np.float32,
+        'd': np.float64,
+        'n': np.int32,
+        '' : np.float32
+    }
+    return dtype_map[s]
+
+def to_pixel_type(dtype):
+    for s in 'czfdn':
+        if np.dtype(to_np_type(s)) == np.dtype(dtype).newbyteorder('='):
+            return s
+    raise ValueError(f"unsupported pixel type {dtype}")
+
+def load_binary_image_file(path, shape, pixel_type, mmap=False):
     def auto_args_if_need(path, shape, pixel_type):
         default_type = {
             4 : 'f',
@@ -279,14 +1158,14 @@ def load_binary_image_file(path, shape, pixel_type):
             # n = a * w * h
             for a in range(2, 16):
                 if 0 == n1 % a:
-                    n1 = int(n1/a)
-                    w = int(math.sqrt(n1))
-                    if w * w == n1:
+                    w = int(math.sqrt(n1 // a))
+                    if w * w == n1 // a:
                         shape = [w *a, w]
                         return  shape, pixel_type
             raise RuntimeError("declshape failed")
         # auto type
         if '' == pixel_type and 0 != len(shape):
+            shape = [int(shape[0]), int(shape[1])]
             i = int(n / np.prod(shape))
             assert(i * np.prod(shape) == n)
             if i in default_type:
@@ -297,15 +1176,34 @@ def load_binary_image_file(path, shape, pixel_type):
         if '' == pixel_type and 0 == len(shape):
             # single image 
             # n = t * w * h
-            for t in default_type.keys():
+            candidates = []
+            for t in sorted(default_type.keys()):
                 n1 = int(n/t)
                 w = int(math.sqrt(n1))
-                if w * w == n1:
-                    pixel_type = default_type[t]
-                    shape = [w, w]
-                    return shape, pixel_type
-            raise RuntimeError("decltype&shape failed")
+                if 0 == n % t and w * w == n1:
+                    candidates.append(([w, w], default_type[t]))
+            if 0 == len(candidates):
+                raise RuntimeError("decltype&shape failed")
+            # 多个解时固定选像素类型最小的一个, 需要其他解请写 sidecar 或显式指定参数
+            if 1 < len(candidates):
+                print(f"    ambiguous shape/type of {path}: {candidates}, use {candidates[0]}")
+            return candidates[0]
         return [int(shape[0]), int(shape[1])], pixel_type
+    byteorder = '='
+    # 字节序是文件本身的属性, 显式给出形状和类型时也要从 sidecar 读取
+    meta = read_image_sidecar(path)
+    if meta is not None:
+        byteorder = meta['byteorder']
+    if 0 == len(shape) or '' == pixel_type:
+        if meta is not None:
+            if 0 == len(shape): shape = meta['file_shape']
+            if '' == pixel_type: pixel_type = meta['dtype']
+        else:
+            cached = probe_cache_get(path, shape, pixel_type)
+            if cached is None:
+                cached = auto_args_if_need(path, shape, pixel_type)
+                probe_cache_put(path, shape, pixel_type, cached)
+            shape, pixel_type = cached
     shape, pixel_type = auto_args_if_need(path, shape, pixel_type)
     def print_image_info(path, shape, pixel_type):
         print("* image visualizer")
@@ -313,7 +1211,13 @@ def load_binary_image_file(path, shape, pixel_type):
         print("    shape=", shape)
         print("    type =", pixel_type)
     print_image_info(path, shape, pixel_type)
-    data = np.fromfile(path, dtype=to_np_type(pixel_type))
+    dtype = np.dtype(to_np_type(pixel_type)).newbyteorder(byteorder)
+    if mmap:
+        # 只映射文件, 访问到的页才会被读入内存
+        return np.memmap(path, dtype=dtype, mode='r', shape=tuple(shape))
+    data = np.fromfile(path, dtype=dtype)
+    if not dtype.isnative:
+        data = data.astype(dtype.newbyteorder('='))
     data = np.reshape(data, shape)
     # if pixel_type in ['c', 'z']:
     #     print("    origin=")
@@ -321,23 +1225,624 @@ def load_binary_image_file(path, shape, pixel_type):
     #     data = np.abs(data)
     return data
 
+# sidecar metadata
+# 写入方可以在 <path>.json 中记录形状/类型/帧数/字节序, 读取时不再按文件大小猜测.
+# 没有 sidecar 时, 推断结果按 (路径, 大小, mtime) 缓存在临时目录中, 同一文件重复打开时直接复用.
+def image_sidecar_path(path):
+    return path + '.json'
+
+def write_image_sidecar(path, shape, pixel_type, stack=1, byteorder=None):
+    """
+    为原始二进制图像写 sidecar 元数据。
+
+    参数:
+        path (str): 图像文件路径, 元数据写在 path + '.json'。
+        shape (list): 单帧形状 [h, w]。
+        pixel_type (str): 像素类型, 见 to_np_type。
+        stack (int): 帧数, 文件形状为 [h * stack, w]。
+        byteorder (str): 'little' 或 'big', 默认本机字节序。
+    """
+    import json
+    import sys
+    meta = {
+        'shape': [int(shape[0]), int(shape[1])],
+        'dtype': pixel_type,
+        'stack': int(stack),
+        'byteorder': byteorder or sys.byteorder
+    }
+    with open(image_sidecar_path(path), 'w') as f:
+        json.dump(meta, f)
+    return image_sidecar_path(path)
+
+def save_binary_image_file(path, data, pixel_type=None, stack=1):
+    data = np.ascontiguousarray(data)
+    if pixel_type is None:
+        pixel_type = to_pixel_type(data.dtype)
+    data.tofile(path)
+    h, w = data.shape[0] // stack, data.shape[-1]
+    return write_image_sidecar(path, [h, w], pixel_type, stack, {'<': 'little', '>': 'big'}.get(data.dtype.byteorder))
+
+def read_image_sidecar(path):
+    import json
+    sidecar = image_sidecar_path(path)
+    if not os.path.exists(sidecar):
+        return None
+    try:
+        with open(sidecar, 'r') as f:
+            meta = json.load(f)
+        h, w = [int(v) for v in meta['shape']]
+        stack = int(meta.get('stack', 1))
+        pixel_type = meta['dtype']
+        byteorder = {'little': '<', 'big': '>'}[meta.get('byteorder', 'little')]
+        nbytes = h * stack * w * np.dtype(to_np_type(pixel_type)).itemsize
+    except Exception as e:
+        print(f"    invalid sidecar {sidecar}: {e}")
+        return None
+    if nbytes != os.stat(path).st_size:
+        print(f"    sidecar {sidecar} doesn't match file size, ignored")
+        return None
+    return {'shape': [h, w], 'file_shape': [h * stack, w], 'stack': stack, 'dtype': pixel_type, 'byteorder': byteorder}
+
+probe_cache = None
+probe_cache_limit = 1024
+def probe_cache_path():
+    import tempfile
+    return os.path.join(tempfile.gettempdir(), "py_visualizer_probe_cache.json")
+
+def probe_cache_key(path, shape, pixel_type):
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}|{list(map(str, shape))}|{pixel_type}"
+
+def probe_cache_get(path, shape, pixel_type):
+    global probe_cache
+    import json
+    if probe_cache is None:
+        try:
+            with open(probe_cache_path(), 'r') as f:
+                probe_cache = json.load(f)
+        except (OSError, ValueError):
+            probe_cache = {}
+    return probe_cache.get(probe_cache_key(path, shape, pixel_type))
+
+def probe_cache_stale(key):
+    file, size, mtime = key.rsplit('|', 4)[:3]
+    try:
+        st = os.stat(file)
+    except OSError:
+        return True
+    return f"{st.st_size}|{st.st_mtime_ns}" != f"{size}|{mtime}"
+
+def probe_cache_put(path, shape, pixel_type, result):
+    import json
+    global probe_cache
+    # 文件被删除或改写后旧条目不会再命中, 写回前清理掉; 仍然超过上限时丢弃最早加入的条目
+    probe_cache = {k: v for k, v in probe_cache.items() if not probe_cache_stale(k)}
+    probe_cache[probe_cache_key(path, shape, pixel_type)] = [list(result[0]), result[1]]
+    for stale in list(probe_cache)[:max(0, len(probe_cache) - probe_cache_limit)]:
+        del probe_cache[stale]
+    # 先写临时文件再替换, 多个进程同时写时不会留下半个文件
+    temp = f"{probe_cache_path()}.{os.getpid()}"
+    try:
+        with open(temp, 'w') as f:
+            json.dump(probe_cache, f)
+        os.replace(temp, probe_cache_path())
+    except OSError:
+        pass
+
+class binary_image_stack:
+    """
+    以 np.memmap 打开 [w * a, w] 形状的二进制图像栈, 按帧或子窗口惰性读取。
+
+    stack[i] 返回第 i 帧的视图, stack[i, y0:y1, x0:x1] 返回子窗口的视图,
+    只有真正访问到的数据才会从磁盘读入, 不会加载整个栈。
+    """
+    def __init__(self, path, shape=[], pixel_type='', frame_shape=None):
+        self.args = (path, tuple(shape), pixel_type, frame_shape)
+        self.data = load_binary_image_file(path, shape, pixel_type, mmap=True)
+        h, w = self.data.shape
+        meta = read_image_sidecar(path)
+        if frame_shape is None and meta is not None:
+            frame_shape = meta['shape']
+        if frame_shape is None:
+            frame_shape = (w, w) if 0 == h % w else (h, w)
+        fh, fw = int(frame_shape[0]), int(frame_shape[1])
+        assert(fw == w and 0 == h % fh)
+        self.frames = self.data.reshape(h // fh, fh, fw)
+    def __len__(self):
+        return self.frames.shape[0]
+    def __getitem__(self, key):
+        return self.frames[key]
+    @property
+    def frame_shape(self):
+        return self.frames.shape[1:]
+    @property
+    def dtype(self):
+        return self.frames.dtype
+    def read(self, index, window=None):
+        # 复制成普通 ndarray, 便于传给 c++
+        frame = self.frames[index]
+        if window is not None:
+            y0, y1, x0, x1 = window
+            frame = frame[y0:y1, x0:x1]
+        return np.array(frame)
+    def close(self):
+        self.frames = None
+        self.data = None
+
+def load_binary_image_frame(path, index, shape=[], pixel_type='', window=None):
+    return binary_image_stack(path, shape, pixel_type).read(int(index), window)
+
+# shared memory frame ring
+# 求解器 (c++ 的 shm_frame_writer, 或 python 的 frame_ring_buffer.write) 把帧写进共享内存环形缓冲区,
+# 独立的可视化进程 attach 后只读最新的一帧, 绘图再慢也不会阻塞求解器.
+# 布局 (int64, 小端):
+#   全局头 64 字节: magic, version, slots, slot_bytes, write_seq
+#   每个槽位: 64 字节头 (seq, ndim, shape0, shape1, pixel_type, nbytes, commit_seq) + slot_bytes 数据
+# 写入时先把 seq 置为 -1, 写完数据和头后再写 commit_seq 和 seq, 读者前后比较 seq 判断是否读到了半帧.
+ring_magic = int.from_bytes(b'PYVRING1', 'little')
+ring_header_bytes = 64
+ring_slot_header_bytes = 64
+# 本进程创建的共享内存名称, 由创建方的 resource_tracker 记录负责清理
+ring_created_names = set()
+def attach_shared_memory(name):
+    """attach 已存在的共享内存, 不交给 resource_tracker, 读者退出时不会 unlink 写入方的共享内存"""
+    import sys
+    from multiprocessing import shared_memory, resource_tracker
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    # 旧版本 attach 时也会登记; 同一进程中已经由创建方登记过的不能撤销, 否则创建方 unlink 时 tracker 报 KeyError
+    if name not in ring_created_names:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+class frame_ring_buffer:
+    def __init__(self, name, create=False, slots=4, slot_bytes=0):
+        from multiprocessing import shared_memory
+        if create:
+            size = ring_header_bytes + slots * (ring_slot_header_bytes + slot_bytes)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            ring_created_names.add(name)
+            header = np.ndarray((8,), np.int64, self.shm.buf)
+            header[:] = [ring_magic, 1, slots, slot_bytes, 0, 0, 0, 0]
+        else:
+            self.shm = attach_shared_memory(name)
+        self.owner = create
+        self.header = np.ndarray((8,), np.int64, self.shm.buf)
+        if ring_magic != self.header[0]:
+            # 也可能是写入方还没写完全局头, 调用方可以重试; 先释放映射
+            self.close()
+            raise RuntimeError(f"{name} is not a frame ring buffer")
+        self.slots, self.slot_bytes = int(self.header[2]), int(self.header[3])
+        if create:
+            for i in range(self.slots): self.slot_header(i)[0] = 0
+    def slot_offset(self, i):
+        return ring_header_bytes + i * (ring_slot_header_bytes + self.slot_bytes)
+    def slot_header(self, i):
+        return np.ndarray((8,), np.int64, self.shm.buf, self.slot_offset(i))
+    def slot_payload(self, i, nbytes):
+        return np.ndarray((nbytes,), np.uint8, self.shm.buf, self.slot_offset(i) + ring_slot_header_bytes)
+    def write_seq(self):
+        return int(self.header[4])
+    def write(self, frame, pixel_type=None):
+        frame = np.ascontiguousarray(frame)
+        if pixel_type is None:
+            pixel_type = to_pixel_type(frame.dtype)
+        if frame.nbytes > self.slot_bytes or frame.ndim > 2:
+            raise ValueError(f"frame {frame.shape} {frame.dtype} doesn't fit in slot of {self.slot_bytes} bytes")
+        seq = self.write_seq() + 1
+        slot = seq % self.slots
+        hdr = self.slot_header(slot)
+        hdr[0] = -1
+        self.slot_payload(slot, frame.nbytes)[:] = frame.reshape(-1).view(np.uint8)
+        shape = frame.shape + (1,) * (2 - frame.ndim)
+        hdr[1:6] = [frame.ndim, shape[0], shape[1], ord(pixel_type), frame.nbytes]
+        hdr[6] = seq
+        hdr[0] = seq
+        self.header[4] = seq
+        return seq
+    def read(self, seq):
+        # 返回第 seq 帧的副本, 已被覆盖或正在写入时返回 None
+        hdr = self.slot_header(seq % self.slots)
+        if seq != hdr[0]: return None
+        ndim, h, w, pixel_type, nbytes = [int(v) for v in hdr[1:6]]
+        payload = np.array(self.slot_payload(seq % self.slots, nbytes))
+        if seq != hdr[0] or seq != hdr[6]: return None
+        shape = (h, w)[:ndim]
+        return payload.view(to_np_type(chr(pixel_type))).reshape(shape)
+    def read_latest(self, last_seq=0):
+        # 返回 (seq, frame); 没有新帧时返回 (last_seq, None)
+        seq = self.write_seq()
+        while seq > last_seq:
+            frame = self.read(seq)
+            if frame is not None: return seq, frame
+            seq = self.write_seq()
+        return last_seq, None
+    def close(self):
+        self.header = None
+        self.shm.close()
+    def unlink(self):
+        # 只有创建方删除共享内存, attach 的读者删除会让写入方之后的帧没有人能读到
+        if not self.owner:
+            raise RuntimeError(f"frame ring {self.shm.name} is not owned by this process")
+        self.shm.unlink()
+        ring_created_names.discard(self.shm.name)
+
+def view_frame_ring(name, interval=0.01, timeout=10.0):
+    """
+    在当前进程中 attach 共享内存帧环, 持续显示最新的一帧, 直到窗口关闭。
+
+    参数:
+        name (str): 共享内存名称, 与写入方一致。
+        interval (float): 轮询与事件循环间隔 (秒)。
+        timeout (float): 等待写入方创建并初始化共享内存的最长时间 (秒)。
+    """
+    global frame_index
+    begin = time.perf_counter()
+    while True:
+        try:
+            ring = frame_ring_buffer(name)
+            break
+        except (FileNotFoundError, ValueError, RuntimeError):
+            # 写入方 shm_open 之后、ftruncate 之前大小为 0 (ValueError), 写 magic 之前不是合法的帧环 (RuntimeError)
+            if time.perf_counter() - begin > timeout: raise
+            time.sleep(interval)
+    last_seq, dropped = 0, 0
+    try:
+        while ax is None or plt.fignum_exists(ax.figure.number):
+            seq, frame = ring.read_latest(last_seq)
+            if frame is None:
+                if ax is not None: plt.pause(interval)
+                else: time.sleep(interval)
+                continue
+            if last_seq: dropped = dropped + seq - last_seq - 1
+            last_seq = frame_index = seq
+            draw_frame(frame)
+            text.set_text(text.get_text() + f" dropped:{dropped}")
+            plt.pause(interval)
+    finally:
+        ring.close()
+
+# image stack player
+# 后台线程把当前帧之后的 depth 帧预读进环形缓冲区, 第 i 帧固定存放在 i % depth 槽位.
+class frame_prefetcher:
+    def __init__(self, stack, depth=4):
+        self.stack = stack
+        self.depth = max(1, int(depth))
+        self.ring = np.empty((self.depth,) + tuple(stack.frame_shape), stack.dtype)
+        self.slots = [-1] * self.depth
+        self.position = 0
+        self.stopped = False
+        self.error = None
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    def next_missing(self):
+        for i in range(self.position, min(len(self.stack), self.position + self.depth)):
+            if self.slots[i % self.depth] != i:
+                return i
+        return None
+    def run(self):
+        try:
+            while True:
+                with self.cond:
+                    while not self.stopped and self.next_missing() is None:
+                        self.cond.wait()
+                    if self.stopped: return
+                    index = self.next_missing()
+                    slot = index % self.depth
+                    self.slots[slot] = -1
+                # 磁盘读取不持锁
+                np.copyto(self.ring[slot], self.stack[index])
+                with self.cond:
+                    self.slots[slot] = index
+                    self.cond.notify_all()
+        except BaseException as e:
+            # 读帧失败时唤醒 get(), 由调用方抛出, 否则 get() 会一直等下去
+            with self.cond:
+                self.error = e
+                self.cond.notify_all()
+    def get(self, index):
+        with self.cond:
+            self.position = index
+            self.cond.notify_all()
+            while self.slots[index % self.depth] != index:
+                if self.error is not None:
+                    raise RuntimeError(f"failed to prefetch frame {index}") from self.error
+                self.cond.wait()
+            return self.ring[index % self.depth]
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+        self.thread.join()
+
+def play_frames(source, fps=10.0, prefetch=4, loop=False, start=0):
+    """
+    逐帧播放 source, 后台线程预读后续帧。
+
+    参数:
+        source: 支持 len(), source[i], source.frame_shape, source.dtype 的帧序列,
+            如 binary_image_stack 或 frame_record_reader。
+        fps (float): 目标播放帧率。
+        prefetch (int): 预读帧数 (环形缓冲区大小)。
+        loop (bool): 播放到最后一帧后是否从头开始。
+        start (int): 起始帧。
+
+    按键: 空格 暂停/继续, 左右方向键 单帧前进/后退。
+    """
+    global frame_index
+    prefetcher = frame_prefetcher(source, prefetch)
+    n = len(source)
+    state = {'index': int(start) % n, 'paused': False, 'step': 0}
+    def on_key(event):
+        if ' ' == event.key: state['paused'] = not state['paused']
+        elif 'right' == event.key: state['step'] = 1
+        elif 'left' == event.key: state['step'] = -1
+    period = 1.0 / fps
+    cid = None
+    try:
+        shown = None
+        while True:
+            begin = time.perf_counter()
+            index = state['index']
+            if index != shown:
+                frame_index = index
+                draw_frame(prefetcher.get(index))
+                if cid is None:
+                    cid = ax.figure.canvas.mpl_connect('key_press_event', on_key)
+                shown = index
+            if not plt.fignum_exists(ax.figure.number): break
+            plt.pause(max(1e-3, period - (time.perf_counter() - begin)))
+            if not plt.fignum_exists(ax.figure.number): break
+            if state['step']:
+                state['index'] = (index + state['step']) % n
+                state['step'] = 0
+            elif not state['paused']:
+                if index + 1 < n: state['index'] = index + 1
+                elif loop: state['index'] = 0
+                else: state['paused'] = True
+    finally:
+        if cid is not None: ax.figure.canvas.mpl_disconnect(cid)
+        prefetcher.stop()
+
+def play_image_stack(path, shape=[], pixel_type='', fps=10.0, prefetch=4, loop=False, start=0):
+    """
+    逐帧播放二进制图像栈, 参数同 play_frames。
+
+    参数:
+        path (str): 二进制文件路径, 形状为 [w * a, w] 的图像栈。
+        shape, pixel_type: 同 load_binary_image_file, 为空时自动推断。
+    """
+    stack = binary_image_stack(path, shape, pixel_type)
+    try:
+        play_frames(stack, fps, prefetch, loop, start)
+    finally:
+        stack.close()
+
+# frame recording
+# update() 收到的帧复制一份后交给后台线程, 用 zlib 逐帧压缩追加到 <path>,
+# 每帧在 <path>.idx 中占一条定长记录 (offset, 压缩后字节数, 原始字节数, ndim, shape0, shape1, pixel_type, 时间戳),
+# 回放时按帧号直接定位记录, 不需要顺序扫描.
+record_index_fields = 8
+class frame_recorder:
+    def __init__(self, path, level=1, queue_size=64, max_queued_bytes=256 << 20):
+        import zlib
+        self.zlib = zlib
+        self.path = path
+        self.level = level
+        self.data_file = open(path, 'wb')
+        self.index_file = open(path + '.idx', 'wb')
+        self.offset = 0
+        self.count = 0
+        self.dropped = 0
+        self.error = None
+        # 队列中未压缩帧的字节数, 超出预算时丢帧而不是阻塞 update()
+        self.max_queued_bytes = max_queued_bytes
+        self.queued_bytes = 0
+        self.lock = threading.Lock()
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    def append(self, frame):
+        if self.error is not None:
+            raise RuntimeError(f"frame recorder {self.path} stopped") from self.error
+        to_pixel_type(frame.dtype)
+        with self.lock:
+            if self.queued_bytes + frame.nbytes > self.max_queued_bytes or self.frames.full():
+                self.dropped = self.dropped + 1
+                return False
+            self.queued_bytes = self.queued_bytes + frame.nbytes
+        # 调用方 (c++) 的缓冲区会被复用, 这里必须复制; 只有本线程放入, 不会因队列满而阻塞
+        self.frames.put_nowait((np.array(frame, copy=True), time.time_ns()))
+        return True
+    def run(self):
+        try:
+            while True:
+                item = self.frames.get()
+                if item is None: break
+                frame, stamp = item
+                # zlib 压缩时释放 GIL, 不会阻塞绘图线程
+                blob = self.zlib.compress(np.ascontiguousarray(frame).tobytes(), self.level)
+                shape = frame.shape + (1,) * (2 - frame.ndim)
+                record = np.array([self.offset, len(blob), frame.nbytes, frame.ndim,
+                    shape[0], shape[1], ord(to_pixel_type(frame.dtype)), stamp], np.int64)
+                self.data_file.write(blob)
+                self.index_file.write(record.tobytes())
+                self.offset = self.offset + len(blob)
+                self.count = self.count + 1
+                with self.lock:
+                    self.queued_bytes = self.queued_bytes - frame.nbytes
+        except BaseException as e:
+            # append()/close() 把异常抛给调用方
+            self.error = e
+        finally:
+            self.data_file.close()
+            self.index_file.close()
+    def close(self):
+        # 写线程可能已经因异常退出, 不能无限期等待队列空出位置
+        while self.thread.is_alive():
+            try:
+                self.frames.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self.thread.join()
+        print(f"    recorded {self.count} frames to {self.path}, dropped {self.dropped}")
+        if self.error is not None:
+            raise RuntimeError(f"frame recorder {self.path} failed") from self.error
+
+class frame_record_reader:
+    def __init__(self, path):
+        import zlib
+        self.zlib = zlib
+        self.index = np.fromfile(path + '.idx', np.int64).reshape(-1, record_index_fields)
+        self.file = open(path, 'rb')
+    def __len__(self):
+        return self.index.shape[0]
+    def __getitem__(self, i):
+        offset, nbytes, raw_nbytes, ndim, h, w, pixel_type, stamp = [int(v) for v in self.index[i]]
+        self.file.seek(offset)
+        raw = self.zlib.decompress(self.file.read(nbytes))
+        assert(len(raw) == raw_nbytes)
+        return np.frombuffer(raw, to_np_type(chr(pixel_type))).reshape((h, w)[:ndim])
+    @property
+    def frame_shape(self):
+        ndim, h, w = [int(v) for v in self.index[0, 3:6]]
+        return (h, w)[:ndim]
+    @property
+    def dtype(self):
+        return np.dtype(to_np_type(chr(int(self.index[0, 6]))))
+    def timestamps(self):
+        return self.index[:, 7].copy()
+    def close(self):
+        self.file.close()
+
+live_recorder = None
+def set_frame_recording(path=None, level=1, max_queued_bytes=256 << 20):
+    """
+    开始/停止记录 update() 收到的帧。
+
+    参数:
+        path (str): 记录文件路径, 索引写在 path + '.idx'; None 表示停止记录。
+        level (int): zlib 压缩级别 (1-9)。
+        max_queued_bytes (int): 等待压缩的帧最多占用的字节数, 压缩跟不上时丢帧 (见 frame_recorder.dropped)。
+    写线程出错时 update() 和停止记录都会抛出异常。
+    """
+    global live_recorder
+    recorder, live_recorder = live_recorder, None
+    if recorder is not None:
+        recorder.close()
+    if path is not None:
+        live_recorder = frame_recorder(path, level, max_queued_bytes=max_queued_bytes)
+
+def replay_frames(path, fps=10.0, prefetch=4, loop=False, start=0):
+    """
+    回放 set_frame_recording 记录的帧, 参数同 play_frames。
+    """
+    reader = frame_record_reader(path)
+    try:
+        play_frames(reader, fps, prefetch, loop, start)
+    finally:
+        reader.close()
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="image visualizer")
-    parser.add_argument("--path", type=str, required=True)
+    parser.add_argument("--path", type=str, default="")
+    parser.add_argument("--shm", type=str, default="", help="attach 共享内存帧环并实时显示")
     parser.add_argument("--shape",type=str, nargs="+", default= [])
     parser.add_argument("--type", type=str, default="")
+    parser.add_argument("--frame", type=int, default=-1, help="只显示图像栈中的第 frame 帧")
+    parser.add_argument("--play", action="store_true", help="逐帧播放图像栈")
+    parser.add_argument("--replay", action="store_true", help="回放 set_frame_recording 记录的帧")
+    parser.add_argument("--fps", type=float, default=10.0)
+    parser.add_argument("--export", type=str, default="", help="把图像栈导出为 PNG 目录或 .mp4 文件")
     args = parser.parse_args() 
-    assert(os.path.exists(args.path))
-    display_image(load_binary_image_file(args.path, args.shape, args.type))
+    if "" != args.shm:
+        view_frame_ring(args.shm)
+    elif not os.path.exists(args.path):
+        parser.error(f"invalid path: {args.path}")
+    elif "" != args.export:
+        export_frames(binary_image_stack(args.path, args.shape, args.type), args.export, fps=args.fps)
+    elif args.replay:
+        replay_frames(args.path, fps=args.fps, start=max(0, args.frame))
+    elif args.play:
+        play_image_stack(args.path, args.shape, args.type, fps=args.fps, start=max(0, args.frame))
+    elif 0 <= args.frame:
+        display_image(binary_image_stack(args.path, args.shape, args.type)[args.frame])
+    else:
+        display_image(load_binary_image_file(args.path, args.shape, args.type))
     # 显示图像
     plt.show()
 
-def plot_surface(x, y, matrix):
+surface_max_polygons = 40000
+surface_preview_size = 1 << 20
+
+def surface_stride(shape, max_polygons=surface_max_polygons):
+    """
+    根据多边形预算计算 plot_surface 的 rstride/cstride.
+    参数:
+        shape: 网格的 (rows, cols)
+        max_polygons: 最多绘制的四边形数量
+    """
+    rows, cols = shape[0], shape[1]
+    quads = max(1, (rows - 1) * (cols - 1))
+    if quads <= max_polygons:
+        return 1, 1
+    # 两个方向使用相同步长, 保持网格的宽高比
+    step = int(np.ceil(np.sqrt(quads / max(1, max_polygons))))
+    return min(step, max(1, rows - 1)), min(step, max(1, cols - 1))
+
+def decimate_surface(x, y, matrix, max_polygons=surface_max_polygons, decimate='stride'):
+    """
+    按预算缩减 surface 网格, 返回 (x, y, matrix, rstride, cstride).
+    参数:
+        decimate: 'stride' 等间隔取点; 'mean' 块平均, 保留小尺度结构的均值; 'max' 块最大值, 保留峰值
+    """
+    rstride, cstride = surface_stride(matrix.shape, max_polygons)
+    if (1, 1) == (rstride, cstride):
+        return x, y, matrix, 1, 1
+    if 'stride' == decimate:
+        # 自己切片而不是把 stride 交给 matplotlib, 它会在完整网格上计算法线和颜色; 保留最后一行/列作为边界
+        rows = np.unique(np.r_[np.arange(0, matrix.shape[0], rstride), matrix.shape[0] - 1])
+        cols = np.unique(np.r_[np.arange(0, matrix.shape[1], cstride), matrix.shape[1] - 1])
+        grid = np.ix_(rows, cols)
+        return x[grid], y[grid], matrix[grid], 1, 1
+    if decimate not in ('mean', 'max'):
+        raise ValueError("unknown surface decimate mode %s" % decimate)
+    # 坐标总是取块平均, 数值按 decimate 选择
+    return (block_reduce(x, rstride, cstride), block_reduce(y, rstride, cstride),
+        block_reduce(matrix, rstride, cstride, decimate), 1, 1)
+
+def plot_surface(x, y, matrix, max_polygons=surface_max_polygons, decimate='stride', wireframe=False):
+    """
+    参数:
+        x, y: 与 matrix 同形状的坐标网格, 或者长度为 cols/rows 的一维坐标
+        max_polygons: 多边形预算, 超出时自动选择 stride 或块缩减; None 表示绘制完整网格
+        decimate: 'stride', 'mean' 或 'max', 参考 decimate_surface
+        wireframe: True 只画线框预览; 'auto' 在 matrix 超过 surface_preview_size 时使用线框
+    """
+    matrix = np.asarray(matrix)
+    # 按输入大小判断, 缩减之后的 matrix 总是在预算以内
+    if 'auto' == wireframe:
+        wireframe = matrix.size > surface_preview_size
+    x, y = np.asarray(x), np.asarray(y)
+    if 1 == x.ndim and 1 == y.ndim:
+        x, y = np.meshgrid(x, y)
+    if None is max_polygons:
+        rstride, cstride = 1, 1
+    else:
+        x, y, matrix, rstride, cstride = decimate_surface(x, y, matrix, max_polygons, decimate)
     fig = plt.figure()
     ax = fig.add_subplot(111, projection='3d')
-    surf = ax.plot_surface(x, y, matrix, cmap='viridis')
-    fig.colorbar(surf)
+    if wireframe:
+        ax.plot_wireframe(x, y, matrix, rstride=rstride, cstride=cstride, linewidth=0.5)
+    else:
+        # 显式传 stride, 否则 matplotlib 会按默认 rcount=50 再采样一次
+        surf = ax.plot_surface(x, y, matrix, rstride=rstride, cstride=cstride, cmap='viridis',
+            linewidth=0, antialiased=False)
+        fig.colorbar(surf)
     ax.set_xlabel('$x$')
     ax.set_ylabel('$y$')
     ax.set_zlabel('$z$')